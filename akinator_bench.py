@@ -0,0 +1,227 @@
+# -*- coding: utf-8 -*-
+# Benchmarks reproducibles del motor de preguntas sobre rosters sintéticos
+# (10², 10⁴ y 10⁶ futbolistas con el esquema de CORE_ATTRS + catálogo).
+# Cada tamaño corre en su propio proceso para que la memoria pico sea suya.
+#
+#   python akinator_bench.py [--sizes 100,10000,1000000] [--games 50,50,5] [--seed 0]
+#                            [--json bench.json] [--compare bench_anterior.json]
+#
+# Perfil de partidas guionizadas (en este proceso, primer tamaño de --sizes):
+#   python akinator_bench.py --sizes 10000 --games 3 --profile cprofile|tracemalloc|none
+#                            [--telemetry pasos.jsonl]
+import argparse, cProfile, io, json, os, platform, pstats, random, subprocess, time, tracemalloc
+from multiprocessing import get_context
+
+try:
+    import resource
+except ImportError:  # Windows: sin memoria pico
+    resource = None
+
+import akinator_futbol as af
+from akinator_loadtest import percentile, answer_for
+
+SIZES = (100, 10_000, 1_000_000)
+GAMES = (50, 50, 5)    # partidas de auto-juego por tamaño
+EXTRA_FEATURES = 8     # rasgos de catálogo además de CORE_ATTRS
+MISSING_PROB = 0.05    # atributos sin dato
+CALL_BUDGET = 0.5      # segundos por función en las mediciones sueltas
+MAX_Q = 60
+
+# ---------------- Roster sintético ----------------
+def synthetic_catalog(n_extra=EXTRA_FEATURES):
+    return {f"rasgo_{k}": f"¿Tiene el rasgo {k}?" for k in range(n_extra)}
+
+def synthetic_roster(n, seed=0, catalog=None):
+    catalog=synthetic_catalog() if catalog is None else catalog
+    return list(iter_synthetic_roster(n, seed, catalog)), catalog
+
+def iter_synthetic_roster(n, seed=0, catalog=None):
+    # mismo (n, seed) -> mismo roster; los dominios crecen con n para que
+    # siga habiendo combinaciones suficientes para distinguir a todos.
+    # Generador: RosterColumns lo consume sin tener todos los dicts a la vez.
+    rng=random.Random(seed)
+    catalog=synthetic_catalog() if catalog is None else catalog
+    cats={"posicion":["Portero","Defensa","Medio","Delantero"],
+          "nacionalidad":[f"País {i}" for i in range(min(200, max(8, int(n**0.5))))],
+          "liga":[f"Liga {i}" for i in range(min(40, max(4, int(n**0.25))))],
+          "club":[f"Club {i}" for i in range(max(10, n//40))]}
+    bools=[a for a in af.CORE_ATTRS if a not in cats]+list(catalog)
+    p_true={a: rng.uniform(0.1, 0.5) for a in bools}
+    for i in range(n):
+        attrs={}
+        for a,vals in cats.items():
+            if rng.random()>=MISSING_PROB: attrs[a]=rng.choice(vals)
+        for a in bools:
+            if rng.random()>=MISSING_PROB: attrs[a]=rng.random()<p_true[a]
+        yield {"nombre":f"Jugador {i:07d}", "atributos":attrs}
+
+def synthetic_columns(n, seed=0):
+    catalog=synthetic_catalog()
+    return af.RosterColumns(iter_synthetic_roster(n, seed, catalog)), catalog
+
+# ---------------- Auto-juego ----------------
+ANSWERS = (True, False, None)
+
+def self_play(roster, target, seed, lat=None, mode=None, noise=0.0, max_q=MAX_Q):
+    # -> (preguntas, acertó); lat recibe la latencia de cada paso. Con noise>0
+    # cada respuesta se cambia por otra al azar con esa probabilidad.
+    random.seed(seed); err=random.Random(f"ruido:{seed}") if noise else None
+    s=af.GameSession(roster, mode)
+    t=time.perf_counter(); step=s.next_question()
+    if lat is not None: lat.append(time.perf_counter()-t)
+    n=0
+    while step["type"]=="question" and n<max_q:
+        ans=answer_for(target, step["q"])
+        if err is not None and err.random()<noise: ans=err.choice([a for a in ANSWERS if a is not ans])
+        t=time.perf_counter(); step=s.answer(ans)
+        if lat is not None: lat.append(time.perf_counter()-t)
+        n+=1
+    return n, step["type"]=="result" and step["nombre"]==target["nombre"]
+
+def _time_call(fn):
+    # mediana en ms de tantas llamadas como quepan en CALL_BUDGET (mínimo 3)
+    xs=[]; t_end=time.perf_counter()+CALL_BUDGET
+    while len(xs)<3 or time.perf_counter()<t_end:
+        t=time.perf_counter(); fn(); xs.append(time.perf_counter()-t)
+    return round(percentile(xs, 50)*1000, 4)
+
+def time_engine_calls(roster, seed):
+    # estado típico de media partida: dos hechos sobre un objetivo al azar
+    rng=random.Random(seed)
+    target=rng.choice(roster.personajes)["atributos"]
+    hechos={a:target[a] for a in ("posicion","liga") if a in target}
+    ix=roster.index; mask=ix.mask_for(hechos, set()); cands=ix.members(mask)
+    asked={("cat",a,v) for a,v in hechos.items()}
+    pool=list(roster.catalog)
+    two=af.top_two(cands, hechos) if len(cands)>=2 else []
+    levels=ix.match_levels(hechos)
+    cap=af.SCORE_CACHE.capacity; af.SCORE_CACHE.capacity=0  # medir el cálculo, no la caché
+    try:
+        out={"candidates":len(cands),
+             "filter_candidates":_time_call(lambda: af.filter_candidates(roster.cols, hechos, set())),
+             "index_mask_for":_time_call(lambda: ix.mask_for(hechos, set())),
+             "best_question_entropy":_time_call(lambda: af.best_question_entropy(cands, hechos, asked)),
+             "best_question_entropy_index":_time_call(lambda: af.best_question_entropy(cands, hechos, asked, ix, mask)),
+             "_best_from_pool":_time_call(lambda: af._best_from_pool(cands, hechos, asked, pool, ix, mask)),
+             "candidate_probability":_time_call(lambda: af.candidate_probability(cands, hechos)),
+             "candidate_probability_levels":_time_call(lambda: af.candidate_probability(cands, hechos, ix, mask, levels)),
+             "top_two":_time_call(lambda: af.top_two(cands, hechos)),
+             "top_two_levels":_time_call(lambda: af.top_two(cands, hechos, ix, mask, levels))}
+        if len(two)==2: out["discriminating_question"]=_time_call(lambda: af.discriminating_question(two[0], two[1], hechos, asked))
+    finally:
+        af.SCORE_CACHE.capacity=cap; af.SCORE_CACHE.clear()
+    return out
+
+def _peak_rss_mb():
+    if resource is None: return None
+    kb=resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(kb/1024.0, 1)  # Linux: KiB
+
+def bench_size(n, games, seed, mode=None):
+    t=time.perf_counter()
+    cols, catalog = synthetic_columns(n, seed)
+    t_gen=time.perf_counter()-t; t=time.perf_counter()
+    roster=af.Roster(cols, catalog); personajes=roster.personajes
+    roster.names()  # lo usa pick_special_from_data; con el binario ya viene hecho
+    t_build=time.perf_counter()-t
+    calls=time_engine_calls(roster, seed)
+    rng=random.Random(seed); lat=[]; res=[]
+    t0=time.perf_counter()
+    for g in range(games):
+        res.append(self_play(roster, rng.choice(personajes), seed*1_000_003+g, lat, mode))
+    wall=time.perf_counter()-t0
+    return {"players":n, "games":games, "generate_s":round(t_gen,3), "roster_build_s":round(t_build,3),
+            "wall_s":round(wall,3), "games_per_s":round(games/wall,3) if wall else 0.0,
+            "solved":sum(1 for _,ok in res if ok),
+            "mean_questions":round(sum(q for q,_ in res)/len(res),3) if res else 0.0,
+            "max_questions":max((q for q,_ in res), default=0),
+            "latency_ms":{"p50":round(percentile(lat,50)*1000,3), "p90":round(percentile(lat,90)*1000,3),
+                          "p99":round(percentile(lat,99)*1000,3), "max":round(max(lat)*1000,3) if lat else 0.0},
+            "calls_ms":calls, "score_cache":af.SCORE_CACHE.stats(), "peak_rss_mb":_peak_rss_mb()}
+
+def profile_games(n, games, seed, how="cprofile", mode=None, telemetry=None, top=25):
+    # -> (texto del perfil, resumen de telemetría); mismo guion que bench_size
+    cols, catalog = synthetic_columns(n, seed)
+    roster=af.Roster(cols, catalog); personajes=roster.personajes
+    tel=af.enable_telemetry(telemetry) if telemetry is not None else None
+    rng=random.Random(seed); targets=[rng.choice(personajes) for _ in range(games)]
+    def play():
+        for g,t in enumerate(targets): self_play(roster, t, seed*1_000_003+g, None, mode)
+    out=io.StringIO()
+    if how=="cprofile":
+        pr=cProfile.Profile(); pr.enable(); play(); pr.disable()
+        pstats.Stats(pr, stream=out).sort_stats("cumulative").print_stats(top)
+    elif how=="tracemalloc":
+        tracemalloc.start(10); before=tracemalloc.take_snapshot()
+        play()
+        after=tracemalloc.take_snapshot(); _, peak = tracemalloc.get_traced_memory(); tracemalloc.stop()
+        print(f"pico {peak/2**20:.1f} MiB durante {games} partidas; crecimiento por línea:", file=out)
+        for st in after.compare_to(before, "lineno")[:top]: print(f"  {st}", file=out)
+    else:
+        play()
+    if tel is not None: tel.close(); af.TELEMETRY=None
+    return out.getvalue(), tel.summary() if tel is not None else None
+
+def _git_rev():
+    try:
+        return subprocess.run(["git","rev-parse","--short","HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), timeout=5).stdout.strip() or None
+    except Exception:
+        return None
+
+def run(sizes, games, seed, mode=None):
+    out={"commit":_git_rev(), "python":platform.python_version(), "numpy":bool(af.numpy_ok()),
+         "mode":mode or af.ENGINE_MODE, "seed":seed, "sizes":[]}
+    # proceso limpio por tamaño; spawn + PYTHONHASHSEED fijo porque el orden de
+    # los conjuntos de atributos (y con él las preguntas barajadas) depende del hash
+    os.environ["PYTHONHASHSEED"]=str(seed)
+    for n,g in zip(sizes, games):
+        with get_context("spawn").Pool(1) as pool:
+            out["sizes"].append(pool.apply(bench_size, (n, g, seed, mode)))
+    return out
+
+def compare(old, new):
+    # cociente nuevo/anterior de las métricas principales por tamaño
+    prev={s["players"]:s for s in old.get("sizes",[])}
+    lines=[]
+    for s in new["sizes"]:
+        o=prev.get(s["players"])
+        if o is None: continue
+        def ratio(a,b): return f"{b/a:6.2f}x" if a else "   n/a"
+        lines.append(f"{s['players']:>9}  p50 {ratio(o['latency_ms']['p50'], s['latency_ms']['p50'])}"
+                     f"  p99 {ratio(o['latency_ms']['p99'], s['latency_ms']['p99'])}"
+                     f"  juegos/s {ratio(o['games_per_s'], s['games_per_s'])}"
+                     f"  preguntas {o['mean_questions']:.2f} -> {s['mean_questions']:.2f}")
+    return "\n".join(lines)
+
+def main(argv=None):
+    ap=argparse.ArgumentParser(description="Benchmarks del motor del Akinator sobre rosters sintéticos")
+    ap.add_argument("--sizes", default=",".join(map(str, SIZES)), help="tamaños separados por comas")
+    ap.add_argument("--games", default=",".join(map(str, GAMES)), help="partidas por tamaño (una para todos o una por tamaño)")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--mode", choices=("classic","bayes"), default=None)
+    ap.add_argument("--json", default=None, help="guardar el informe en este archivo")
+    ap.add_argument("--compare", default=None, help="informe anterior contra el que comparar")
+    ap.add_argument("--profile", choices=("cprofile","tracemalloc","none"), default=None,
+                    help="perfilar partidas guionizadas del primer tamaño en vez del benchmark")
+    ap.add_argument("--telemetry", default=None, help="con --profile: pasos del motor en JSONL")
+    args=ap.parse_args(argv)
+    sizes=[int(x) for x in args.sizes.split(",") if x.strip()]
+    games=[int(x) for x in args.games.split(",") if x.strip()]
+    if len(games)==1: games=games*len(sizes)
+    if len(games)!=len(sizes): ap.error("--games necesita un valor o uno por tamaño")
+    if args.profile:
+        text, summary = profile_games(sizes[0], games[0], args.seed, args.profile, args.mode,
+                                      args.telemetry or (None if args.profile!="none" else os.devnull))
+        print(text)
+        if summary is not None: print(json.dumps(summary, ensure_ascii=False, indent=2))
+        return
+    out=run(sizes, games, args.seed, args.mode)
+    text=json.dumps(out, ensure_ascii=False, indent=2)
+    print(text)
+    if args.json: af._atomic_write_text(args.json, text)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f: print(compare(json.load(f), out))
+
+if __name__ == "__main__":
+    main()
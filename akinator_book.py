@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+# Construye el libro de aperturas (futbol_opening_book.json) para las primeras
+# QUESTION_MIN_REVEAL preguntas, repartiendo los estados de cada nivel entre
+# los núcleos disponibles.
+#
+#   python akinator_book.py [--processes N] [--out futbol_opening_book.json]
+import argparse, json, os, time
+from multiprocessing import Pool
+
+import akinator_futbol as af
+
+ANSWERS = (True, False, None)
+_ROSTER = None
+
+def _init_worker(datafile):
+    # con fork el roster ya viene del padre; con spawn se carga una vez por proceso
+    global _ROSTER
+    if _ROSTER is None:
+        af.DATAFILE=datafile; _ROSTER=af.Roster.load()
+
+def _entry(prefix):
+    # -> (BOOK_TOPK mejores (puntuación, pregunta), puntuación de la siguiente, ¿quedan candidatos?)
+    s=af.GameSession(_ROSTER).replay(prefix)
+    if not s.cand_mask: return [], None, False
+    ranked=s.phase_ranked()
+    floor=float(ranked[af.BOOK_TOPK][0]) if len(ranked)>af.BOOK_TOPK else None
+    return ranked[:af.BOOK_TOPK], floor, True
+
+def build_opening_book(roster, processes=None, depth=None):
+    global _ROSTER
+    _ROSTER=roster
+    depth=af.QUESTION_MIN_REVEAL if depth is None else depth
+    entries={}; level=[()]
+    with Pool(processes or os.cpu_count() or 1, initializer=_init_worker, initargs=(af.DATAFILE,)) as pool:
+        for d in range(depth):
+            results=pool.map(_entry, level, chunksize=max(1, len(level)//(4*(processes or os.cpu_count() or 1))))
+            nxt=[]
+            for prefix,(top,floor,alive) in zip(level, results):
+                entries[af.book_key(prefix)]={"top":[list(q) for _,q in top], "score":[float(h) for h,_ in top], "floor":floor}
+                if d+1<depth and alive:
+                    # solo se expanden las que se juegan sin priors; con priors, lo demás se calcula
+                    nxt.extend(prefix+((q,a),) for _,q in top[:af.TOPK_RANDOM] for a in ANSWERS)
+            level=nxt
+    return {"dataset_hash":af.dataset_hash(roster.personajes, roster.catalog),
+            "depth":depth, "topk":af.TOPK_RANDOM, "book_topk":af.BOOK_TOPK, "entries":entries}
+
+def main(argv=None):
+    ap=argparse.ArgumentParser(description="Precalcula el libro de aperturas del Akinator")
+    ap.add_argument("--processes", type=int, default=None)
+    ap.add_argument("--out", default=af.OPENING_BOOK)
+    ap.add_argument("--data", default=None, help="ruta alternativa a futbol_dataset.json")
+    args=ap.parse_args(argv)
+    if args.data: af.DATAFILE=args.data
+    t=time.perf_counter()
+    book=build_opening_book(af.Roster(*af.load_roster_columns()), args.processes)
+    af._atomic_write_text(args.out, json.dumps(book, ensure_ascii=False, separators=(",",":")))
+    print(f"{len(book['entries'])} estados en {time.perf_counter()-t:.2f}s -> {args.out}")
+
+if __name__ == "__main__":
+    main()
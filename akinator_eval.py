@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+# Evaluador de auto-juego en paralelo: cada futbolista del dataset hace de
+# objetivo, con varias semillas y niveles de ruido en las respuestas, para
+# cada combinación de parámetros del barrido. El roster se comparte con los
+# procesos del pool (fork) o se carga una vez por proceso (spawn); las tareas
+# solo llevan índices.
+#
+#   python akinator_eval.py [--prob-confirm 0.7,0.8,0.9] [--topk 1,4] [--basic-q 2]
+#                           [--min-reveal 3,4] [--lookahead 0,1] [--noise 0,0.1] [--seeds 3]
+#                           [--synthetic 10000] [--processes N] [--json eval.json]
+#
+# Para resultados idénticos entre ejecuciones fija PYTHONHASHSEED (el orden de
+# los conjuntos de atributos influye en las preguntas barajadas).
+import argparse, itertools, json, os, time
+from multiprocessing import Pool
+
+import akinator_futbol as af
+from akinator_bench import self_play, synthetic_columns, MAX_Q
+
+CHUNK = 64             # objetivos por tarea
+_ROSTER = None; _MODE = None
+
+def _init_worker(source, mode):
+    # con fork el roster ya viene del padre; con spawn se reconstruye una vez
+    global _ROSTER, _MODE
+    _MODE=mode
+    if _ROSTER is None:
+        datafile, synthetic, seed = source
+        if synthetic: _ROSTER=af.Roster(*synthetic_columns(synthetic, seed))
+        else: af.DATAFILE=datafile; _ROSTER=af.Roster(*af.load_roster_columns())  # mmap: una copia en caché para todos
+
+def _play_chunk(task):
+    # -> (partidas, aciertos, suma de preguntas, máximo de preguntas)
+    params, noise, seed, lo, hi, max_q = task
+    for k,v in params.items(): setattr(af, k, v)
+    af.SCORE_CACHE.clear()
+    games=solved=total=worst=0
+    for ti in range(lo, hi):
+        n, ok = self_play(_ROSTER, _ROSTER.personajes[ti], seed*1_000_003+ti, None, _MODE, noise, max_q)
+        games+=1; solved+=ok; total+=n; worst=max(worst, n)
+    return games, solved, total, worst
+
+def sweep_grid(values):
+    # {"PROB_CONFIRM":[...], ...} -> lista de dicts con cada combinación
+    keys=list(values)
+    return [dict(zip(keys, combo)) for combo in itertools.product(*(values[k] for k in keys))]
+
+def evaluate(roster, grid, noises, seeds, processes=None, mode=None, source=(None, 0, 0), max_q=MAX_Q):
+    global _ROSTER
+    _ROSTER=roster
+    n=len(roster.personajes); rows=[]
+    chunks=[(lo, min(lo+CHUNK, n)) for lo in range(0, n, CHUNK)]
+    t_all=time.perf_counter()
+    with Pool(processes or os.cpu_count() or 1, initializer=_init_worker, initargs=(source, mode)) as pool:
+        for params, noise in itertools.product(grid, noises):
+            tasks=[(params, noise, s, lo, hi, max_q) for s in range(seeds) for lo,hi in chunks]
+            t=time.perf_counter()
+            res=pool.map(_play_chunk, tasks, chunksize=1)
+            wall=time.perf_counter()-t
+            games=sum(r[0] for r in res); solved=sum(r[1] for r in res)
+            rows.append({"params":params, "noise":noise, "games":games,
+                         "accuracy":round(solved/games, 4) if games else 0.0,
+                         "mean_questions":round(sum(r[2] for r in res)/games, 3) if games else 0.0,
+                         "max_questions":max((r[3] for r in res), default=0),
+                         "wall_s":round(wall, 3), "games_per_s":round(games/wall, 2) if wall else 0.0})
+    rows.sort(key=lambda r: (-r["accuracy"], r["mean_questions"]))
+    return {"players":n, "seeds":seeds, "mode":mode or af.ENGINE_MODE,
+            "processes":processes or os.cpu_count() or 1,
+            "wall_s":round(time.perf_counter()-t_all, 3), "results":rows}
+
+def _floats(text): return [float(x) for x in text.split(",") if x.strip()]
+def _ints(text): return [int(x) for x in text.split(",") if x.strip()]
+
+def main(argv=None):
+    ap=argparse.ArgumentParser(description="Barrido de parámetros del Akinator por auto-juego en paralelo")
+    ap.add_argument("--prob-confirm", type=_floats, default=[af.PROB_CONFIRM])
+    ap.add_argument("--topk", type=_ints, default=[af.TOPK_RANDOM])
+    ap.add_argument("--basic-q", type=_ints, default=[af.PHASE_BASIC_Q])
+    ap.add_argument("--min-reveal", type=_ints, default=[af.QUESTION_MIN_REVEAL])
+    ap.add_argument("--lookahead", type=_ints, default=[int(af.LOOKAHEAD)], help="0 = voraz, 1 = planificador a dos pasos")
+    ap.add_argument("--noise", type=_floats, default=[0.0, 0.1], help="probabilidad de respuesta errónea")
+    ap.add_argument("--seeds", type=int, default=3)
+    ap.add_argument("--max-q", type=int, default=MAX_Q)
+    ap.add_argument("--mode", choices=("classic","bayes"), default=None)
+    ap.add_argument("--synthetic", type=int, default=0, help="usar un roster sintético de N futbolistas")
+    ap.add_argument("--seed", type=int, default=0, help="semilla del roster sintético")
+    ap.add_argument("--processes", type=int, default=None)
+    ap.add_argument("--data", default=None, help="ruta alternativa a futbol_dataset.json")
+    ap.add_argument("--json", default=None, help="guardar el informe en este archivo")
+    args=ap.parse_args(argv)
+    if args.data: af.DATAFILE=args.data
+    if args.synthetic: roster=af.Roster(*synthetic_columns(args.synthetic, args.seed))
+    else: roster=af.Roster(*af.load_roster_columns())
+    if not roster.personajes: raise SystemExit("El dataset está vacío: no hay objetivos para jugar.")
+    grid=sweep_grid({"PROB_CONFIRM":args.prob_confirm, "TOPK_RANDOM":args.topk,
+                     "PHASE_BASIC_Q":args.basic_q, "QUESTION_MIN_REVEAL":args.min_reveal,
+                     "LOOKAHEAD":[bool(x) for x in args.lookahead]})
+    out=evaluate(roster, grid, args.noise, args.seeds, args.processes, args.mode,
+                 (af.DATAFILE, args.synthetic, args.seed), args.max_q)
+    for r in out["results"]:
+        p=" ".join(f"{k}={v}" for k,v in r["params"].items())
+        print(f"{p}  ruido={r['noise']:.2f}  acierto={r['accuracy']:.3f}  "
+              f"preguntas={r['mean_questions']:.2f}/{r['max_questions']}  {r['games_per_s']:.1f} partidas/s")
+    print(f"{out['players']} objetivos x {args.seeds} semillas en {out['wall_s']:.2f}s ({out['processes']} procesos)")
+    if args.json: af._atomic_write_text(args.json, json.dumps(out, ensure_ascii=False, indent=2))
+
+if __name__ == "__main__":
+    main()
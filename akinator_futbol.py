@@ -1,16 +1,68 @@
 # -*- coding: utf-8 -*-
-import os, json, math, random, shutil, unicodedata, tkinter as tk
-from tkinter import ttk, filedialog
+import time; _T0=time.perf_counter()
+import os, re, sys, json, math, mmap, heapq, bisect, random, hashlib, itertools, operator, queue, shutil, tempfile, threading, contextlib, unicodedata
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from array import array
+from collections import Counter, OrderedDict
+from collections.abc import Mapping, Sequence
+try:
+    import tkinter as tk
+    from tkinter import ttk, filedialog
+except ImportError: tk=ttk=filedialog=None   # servidor sin python3-tk: el motor no lo necesita, solo la app
+try: import fcntl
+except ImportError: fcntl=None   # Windows: msvcrt
+try: import msvcrt
+except ImportError: msvcrt=None
 
 DATAFILE = "futbol_dataset.json"
+JOURNAL_SUFFIX = ".journal.jsonl"
+JOURNAL_COMPACT_EVERY = 200
+LOCK_SUFFIX = ".lock"               # cerrojo entre procesos escritores
+SQLITE_SUFFIXES = (".sqlite",".sqlite3",".db")   # DATAFILE con esta extensión usa SqliteStore
+SQLITE_TIMEOUT_S = 30.0
+ROSTER_BIN_SUFFIX = ".roster.bin"   # roster compilado (mmap) junto al JSON
+OPENING_BOOK = "futbol_opening_book.json"
+OUTCOME_LOG = "futbol_outcomes.jsonl"   # una línea por partida terminada
 WELCOME_IMAGE = "futbol_welcome.png"
 IMAGES_DIR = "images"
-
-try:
-    from PIL import Image, ImageTk
-    PIL_OK = True
-except Exception:
-    PIL_OK = False
+THUMBS_DIR = os.path.join(IMAGES_DIR, ".thumbs")
+IMAGE_POLL_MS = 30
+IMAGE_WORKERS = 2
+IMAGE_LRU_SIZE = 64
+REVEAL_PHOTO_SIZE = (360, 360)
+PREFETCH_PROB = 0.5          # precargar fotos cuando el líder se acerca a PROB_CONFIRM
+PREFETCH_CANDIDATES = 3
+PREFETCH_MIN_SHARE = 0.05
+
+# PIL y numpy se importan al primer uso: no frenan el arranque de la ventana
+Image = ImageTk = np = None
+PIL_OK = NP_OK = None
+_IMPORT_LOCK = threading.Lock()
+
+def pil_ok():
+    global Image, ImageTk, PIL_OK
+    if PIL_OK is None:
+        with _IMPORT_LOCK:
+            if PIL_OK is None:
+                try:
+                    from PIL import Image as _Image, ImageTk as _ImageTk
+                    Image, ImageTk, PIL_OK = _Image, _ImageTk, True
+                except Exception:
+                    PIL_OK = False
+    return PIL_OK
+
+def numpy_ok():
+    global np, NP_OK
+    if NP_OK is None:
+        with _IMPORT_LOCK:
+            if NP_OK is None:
+                try:
+                    import numpy as _np
+                    np, NP_OK = _np, True
+                except Exception:
+                    NP_OK = False
+    return NP_OK
 
 DEFAULT_FEATURE_LIBRARY = {
     "gano_mundial": "¿Ganó la Copa del Mundo?",
@@ -55,64 +107,978 @@ QUESTION_MIN_REVEAL = 4
 QUESTION_MIN_FOR_ADD = 0
 PROB_CONFIRM = 0.80
 TOPK_RANDOM = 4
+BOOK_TOPK = 12               # preguntas por estado en el libro: margen para re-ponderarlas con priors
+NUMPY_SCORER = True
+SCORE_CACHE_SIZE = 4096
+BITSET_CACHE_SIZE = 2048     # bitsets (attr, valor) vivos por índice
+FUZZY_MIN_SIM = 0.45         # Jaccard de trigramas mínimo para avisar de un nombre parecido
+FUZZY_LIMIT = 3
+ENGINE_MODE = "classic"      # "bayes": inferencia tolerante a respuestas erróneas (requiere numpy)
+BAYES_ERROR_RATE = 0.10
+BAYES_MAX_Q = 25
+LOOKAHEAD = False            # planificador de dos pasos en vez de top_two/entropía voraz
+LOOKAHEAD_WIDTH = 8          # preguntas de primer nivel que se miran a dos pasos
+LOOKAHEAD_BUDGET_MS = 200    # por jugada; lo no evaluado a tiempo se descarta
+LOOKAHEAD_PROCESSES = 0      # 0 = en este proceso
+PRIORS_FROM_LOG = True       # la app pondera las preguntas con lo aprendido en OUTCOME_LOG
+PRIOR_STRENGTH = 20.0        # respuestas ficticias con las que se suaviza cada tasa
 
 # ---------------- Persistencia ----------------
-def _ensure_file():
-    if not os.path.exists(DATAFILE):
-        data = {"catalog": DEFAULT_FEATURE_LIBRARY.copy(), "personajes": []}
-        with open(DATAFILE, "w", encoding="utf-8") as f: json.dump(data, f, ensure_ascii=False, indent=2)
+def _normalize_player(p):
+    attrs = dict(p.get("atributos", {}))
+    if "posicion" in attrs:
+        pos = str(attrs["posicion"]).capitalize()
+        if pos not in ("Portero","Defensa","Medio","Delantero"):
+            lo = pos.lower()
+            if "port" in lo: pos="Portero"
+            elif "def" in lo: pos="Defensa"
+            elif "med" in lo or "cen" in lo: pos="Medio"
+            elif "del" in lo: pos="Delantero"
+        attrs["posicion"]=pos
+    p["atributos"]=attrs
+    return p
 
 def _normalize_dataset(data):
     cat = (data.get("catalog") or {}).copy()
     data["catalog"] = cat
-    norm = []
-    for p in data.get("personajes", []):
-        attrs = dict(p.get("atributos", {}))
-        if "posicion" in attrs:
-            pos = str(attrs["posicion"]).capitalize()
-            if pos not in ("Portero","Defensa","Medio","Delantero"):
-                lo = pos.lower()
-                if "port" in lo: pos="Portero"
-                elif "def" in lo: pos="Defensa"
-                elif "med" in lo or "cen" in lo: pos="Medio"
-                elif "del" in lo: pos="Delantero"
-            attrs["posicion"]=pos
-        p["atributos"]=attrs
-        norm.append(p)
-    data["personajes"]=norm
+    data["personajes"]=[_normalize_player(p) for p in data.get("personajes", [])]
     return data
 
-def read_data():
-    _ensure_file()
+def _dump(data): return json.dumps(data, ensure_ascii=False, indent=2)
+
+_UMASK=os.umask(0); os.umask(_UMASK)  # al importar (un solo hilo): os.umask no se puede leer sin cambiarlo
+
+def _keep_mode(tmp, path):
+    # mkstemp crea con 0600: el reemplazo hereda el modo del archivo que sustituye,
+    # o el que daría open() con la umask si es nuevo
+    try: mode=os.stat(path).st_mode & 0o7777
+    except OSError: mode=0o666 & ~_UMASK
+    os.chmod(tmp, mode)
+
+def _atomic_write_text(path, text):
+    # temp + rename en el mismo directorio: un lector nunca ve el archivo a medias
+    d=os.path.dirname(os.path.abspath(path))
+    fd,tmp=tempfile.mkstemp(prefix=".tmp_", suffix=".json", dir=d)
     try:
-        with open(DATAFILE, "r", encoding="utf-8") as f: data = json.load(f)
-    except Exception:
-        data = {"catalog": DEFAULT_FEATURE_LIBRARY.copy(), "personajes": []}
-        write_data(data)
-    data = _normalize_dataset(data)
-    write_data(data)
-    return data
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(text); f.flush(); os.fsync(f.fileno())
+        _keep_mode(tmp, path); os.replace(tmp, path)
+    except BaseException:
+        try: os.unlink(tmp)
+        except OSError: pass
+        raise
+
+def _lock_fd(fd):
+    if fcntl is not None: fcntl.flock(fd, fcntl.LOCK_EX)
+    elif msvcrt is not None: os.lseek(fd, 0, 0); msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+
+def _unlock_fd(fd):
+    if fcntl is not None: fcntl.flock(fd, fcntl.LOCK_UN)
+    elif msvcrt is not None: os.lseek(fd, 0, 0); msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+
+class FileLock:
+    # Cerrojo consultivo entre procesos (flock; msvcrt en Windows) que además
+    # serializa los hilos del proceso. Reentrante: solo el nivel exterior toca
+    # el archivo. Sin path solo hace de RLock.
+    def __init__(self, path):
+        self.path=path; self.fd=None; self.depth=0
+        self.rlock=threading.RLock(); self.acquired=0; self.wait_s=0.0
+
+    def __enter__(self):
+        self.rlock.acquire()
+        if self.depth==0 and self.path:
+            t=time.perf_counter()
+            try:
+                fd=os.open(self.path, os.O_RDWR|os.O_CREAT, 0o644)
+                try: _lock_fd(fd)
+                except BaseException: os.close(fd); raise
+            except BaseException:
+                self.rlock.release(); raise
+            self.fd=fd; self.acquired+=1; self.wait_s+=time.perf_counter()-t
+        self.depth+=1
+        return self
+
+    def __exit__(self, *exc):
+        self.depth-=1
+        if self.depth==0 and self.fd is not None:
+            fd,self.fd=self.fd,None
+            try: _unlock_fd(fd)
+            finally: os.close(fd)
+        self.rlock.release()
+
+def _iter_jsonl(path, pos=0):
+    # -> (registro, posición tras la línea); una línea sin "\n" aún se está escribiendo
+    try: f=open(path, "rb")
+    except OSError: return
+    with f:
+        f.seek(pos)
+        for line in f:
+            if not line.endswith(b"\n"): break
+            pos+=len(line)
+            try: rec=json.loads(line)
+            except ValueError: continue
+            if isinstance(rec, dict): yield rec, pos
+
+def _append_lines(path, lines):
+    # añade líneas JSON (bajo el cerrojo del llamador) con un write + fsync; -> tamaño final
+    blob=("\n".join(lines)+"\n").encode("utf-8")
+    with open(path, "a+b") as f:
+        end=f.seek(0, 2)
+        if end:
+            f.seek(end-1)
+            if f.read(1)!=b"\n": blob=b"\n"+blob  # cierra la línea que dejó un proceso caído
+        f.write(blob); f.flush(); os.fsync(f.fileno())
+        return f.tell()
+
+class DatasetStore:
+    # Caché del JSON normalizado: relee solo si cambia (mtime, tamaño) y
+    # escribe solo si los datos cambiaron de verdad. Las altas van a un
+    # journal JSON Lines (O(1) por alta) que se compacta cada
+    # JOURNAL_COMPACT_EVERY entradas en el JSON principal.
+    # Varios procesos pueden escribir a la vez: toda operación sobre los
+    # archivos va bajo el cerrojo (<dataset>.lock), que primero incorpora lo
+    # que otros añadieron (solo la cola nueva del journal si el JSON no cambió)
+    # y luego escribe; así los seq no se repiten y ninguna alta se pierde al compactar.
+    def __init__(self, path):
+        self.path=path; self.journal_path=os.path.splitext(path)[0]+JOURNAL_SUFFIX
+        self.lock=FileLock(os.path.splitext(path)[0]+LOCK_SUFFIX)
+        self.data=None; self.text=None; self.stat=None
+        self.seq=0; self.base_seq=0; self.jpos=0; self.journal_len=0
+        self.dirty=False; self.loads=0; self.merges=0; self.writes=0; self.gen=0
+        self.streaming=False; self.stats=None; self.slugs=None; self.bin_names=None
+
+    def _changed(self):
+        # los datos en memoria cambiaron: rosters y puntuaciones viejos no sirven
+        self.gen+=1; SCORE_CACHE.clear()
+
+    def _file_stat(self):
+        out=[]
+        for path in (self.path, self.journal_path):
+            try: st=os.stat(path); out.append((st.st_mtime_ns, st.st_size, st.st_ino))
+            except OSError: out.append(None)
+        return tuple(out)
+
+    def _refresh(self, need_data=True):
+        # bajo el cerrojo: trae lo escrito por otros procesos desde la última vez
+        cur=self._file_stat()
+        have=self.data is not None or (self.streaming and not need_data)
+        if have and cur==self.stat: return
+        if have and self.stat is not None and cur[0]==self.stat[0] and cur[1] is not None and cur[1][1]>=self.jpos:
+            # mismo JSON principal y el journal solo creció: basta con la cola
+            n=self._replay(self.base_seq)
+            if n: self.journal_len+=n; self.merges+=1; self._changed()
+            self.stat=cur
+            return
+        self._load()
 
-def write_data(data):
-    with open(DATAFILE, "w", encoding="utf-8") as f: json.dump(data, f, ensure_ascii=False, indent=2)
+    def _load(self):
+        text=None
+        try:
+            with open(self.path, "r", encoding="utf-8") as f: text=f.read()
+            data=json.loads(text)
+        except Exception:
+            data={"catalog": DEFAULT_FEATURE_LIBRARY.copy(), "personajes": []}
+        self.data=_normalize_dataset(data); self.loads+=1; self._changed()
+        self.text=text; self.streaming=False; self.stats=None; self.slugs=None; self.bin_names=None
+        # normalizar cambió algo (o el archivo no existía/estaba roto): se migra una vez
+        migrate=_dump(self.data)!=text
+        self.seq=self.base_seq=data.get("journal_seq",0); self.jpos=0
+        self.journal_len=self._replay(self.base_seq)
+        self.stat=self._file_stat()
+        if migrate: self.dirty=True; self.flush()
+
+    def _replay(self, base_seq):
+        # aplica el journal desde self.jpos; una línea sin "\n" es una escritura
+        # cortada y se deja para la próxima (un escritor la cierra antes de añadir)
+        n=0
+        try: f=open(self.journal_path, "rb")
+        except OSError: return 0
+        with f:
+            f.seek(self.jpos)
+            for line in f:
+                if not line.endswith(b"\n"): break
+                self.jpos+=len(line)
+                try: e=json.loads(line)
+                except ValueError: continue
+                if e.get("seq",0)<=base_seq: continue  # ya compactada
+                self._apply(e); self.seq=max(self.seq, e["seq"]); n+=1
+        return n
+
+    def _apply(self, e):
+        if self.data is None:  # importación en curso o modo ligero: solo cuentan seq y nombres
+            if self.bin_names is not None and e["op"]=="player": self.slugs.add(slugify(e["data"].get("nombre","")))
+            return
+        if e["op"]=="player":
+            p=_normalize_player(e["data"]); self.data["personajes"].append(p)
+            if self.stats is not None: self.stats.add(p["atributos"])
+            if self.slugs is not None: self.slugs.add(slugify(p.get("nombre","")))
+        elif e["op"]=="catalog": self.data["catalog"][e["key"]]=e["question"]
+
+    def _write_journal(self, entries):
+        lines=[]
+        for e in entries:
+            self.seq+=1; e["seq"]=self.seq
+            lines.append(json.dumps(e, ensure_ascii=False))
+        self.jpos=_append_lines(self.journal_path, lines)
+
+    def _has_name(self, name):
+        if self.data is None: return bool(self.bin_names.by_slug(name)) or slugify(name) in self.slugs
+        if self.slugs is None: self.slugs=set(_slugify_many([p.get("nombre","") for p in self.data["personajes"]]))
+        return slugify(name) in self.slugs
+
+    def _light_init(self):
+        # bajo el cerrojo y sin self.data: seq y nombres del roster compilado
+        # para este mismo JSON principal más el journal, sin parsear el JSON.
+        # False si no hay binario de ese JSON (entonces se carga entero).
+        cur=self._file_stat()
+        if cur[0] is None: return False
+        try: cols, _, head = RosterColumns.open_bin(roster_bin_path(self.path))
+        except (OSError, ValueError, KeyError): return False
+        if head.get("source")!=list(cur[0]) or head.get("seq") is None: return False
+        self.bin_names=cols.names(); self.slugs=set(); self.streaming=True
+        self.seq=self.base_seq=head["seq"]; self.jpos=0
+        self.journal_len=self._replay(0)  # todo el journal: cuenta para compactar; nombres repetidos no molestan
+        self.stat=cur
+        return True
+
+    def _sync_append(self):
+        # bajo el cerrojo: lo justo para escribir en el journal con el seq que
+        # toca y comprobar nombres. Con la caché cargada, como siempre; sin ella
+        # (arranque desde el binario) basta el stat y la cola del journal.
+        if self.data is None:
+            if self.bin_names is not None and self._file_stat()[0]==self.stat[0]: return self._refresh(need_data=False)
+            if self._light_init(): return
+        self._refresh()
+
+    def _append(self, entry, unique=None):
+        # unique: nombre que no debe existir ya (comprobado con lo último del disco)
+        with self.lock:
+            self._sync_append()
+            if unique is not None and self._has_name(unique): return False
+            self._write_journal([entry])
+            self._apply(entry); self.journal_len+=1; self._changed()
+            self.stat=self._file_stat()
+            if self.journal_len>=JOURNAL_COMPACT_EVERY: self.compact()
+        return True
+
+    def append_batch(self, entries):
+        # importación masiva: un write + fsync por lote, sin compactar y sin
+        # aplicar en memoria (se suelta la caché; la próxima lectura recarga),
+        # así la RAM no crece con el tamaño de la importación
+        with self.lock:
+            self._refresh(need_data=not self.streaming)
+            self.data=None; self.text=None; self.streaming=True
+            if self.bin_names is None: self.slugs=None
+            else: self.slugs.update(_slugify_many([e["data"].get("nombre","") for e in entries if e["op"]=="player"]))
+            self._write_journal(entries)
+            self.journal_len+=len(entries); self._changed()
+            self.stat=self._file_stat()
+
+    def add_player(self, p, unique=False):
+        return self._append({"op":"player", "data":p}, p.get("nombre","") if unique else None)
+    def add_catalog_entry(self, key, question): self._append({"op":"catalog", "key":key, "question":question})
+
+    def read(self):
+        if self.data is None or self._file_stat()!=self.stat:
+            with self.lock: self._refresh()
+        return self.data
+
+    def bin_source(self):
+        # de qué JSON principal salen los datos leídos (el binario lo guarda junto a seq)
+        return list(self.stat[0]) if self.stat and self.stat[0] else None
+
+    def tail_since(self, source, seq):
+        # -> (jugadores, rasgos) que el journal añadió tras seq, leyendo solo el
+        # journal; None si el JSON principal ya no es source (hay que recompilar)
+        if not source or seq is None: return None
+        with self.lock:
+            cur=self._file_stat()[0]
+            if cur is None or list(cur)!=list(source): return None
+            players=[]; catalog={}
+            for e,_ in _iter_jsonl(self.journal_path):
+                if e.get("seq",0)<=seq: continue
+                if e.get("op")=="player": players.append(_normalize_player(e["data"]))
+                elif e.get("op")=="catalog": catalog[e["key"]]=e["question"]
+            return players, catalog
+
+    def domain_stats(self):
+        # se calcula una vez por carga y luego cada alta lo actualiza en _apply
+        data=self.read()
+        if self.stats is None: self.stats=DomainStats.of(data["personajes"])
+        return self.stats
+
+    def update(self, **fields):
+        # reemplaza campos enteros sobre lo último del disco (las altas
+        # concurrentes van por el journal y no pasan por aquí)
+        with self.lock:
+            self._refresh(); data=self.data
+            if "personajes" in fields: _normalize_dataset({"personajes": fields["personajes"]})
+            data.update(fields)
+            if "personajes" in fields: self.stats=None; self.slugs=None
+            # load_dataset/read_data dan los objetos de la caché: si el llamador
+            # los editó en sitio, comparar con data no ve nada. Decide el texto.
+            self.dirty=True
+            if self.flush(): self._changed()
+
+    def compact(self):
+        with self.lock: self._refresh(); self.dirty=True; self.flush()
+
+    def flush(self):
+        # -> True si reescribió el JSON principal
+        if not self.dirty: return False
+        wrote=False
+        with self.lock:
+            # el JSON principal absorbe el journal: journal_seq marca hasta dónde
+            if self.seq or "journal_seq" in self.data: self.data["journal_seq"]=self.seq
+            text=_dump(self.data)
+            if text!=self.text:
+                _atomic_write_text(self.path, text); self.writes+=1
+                self.text=text; wrote=True
+            self.base_seq=self.seq
+            if self.journal_len:
+                try: os.remove(self.journal_path)
+                except OSError: pass
+                self.journal_len=0; self.jpos=0
+            self.stat=self._file_stat(); self.dirty=False
+        return wrote
+
+class SqliteStore(DatasetStore):
+    # Misma interfaz sobre SQLite en modo WAL, para muchas altas por segundo
+    # desde varios procesos: cada alta es una transacción corta y los lectores
+    # no bloquean. meta.version sube con cada escritura (hace de "stat" para
+    # rosters y binario) y meta.epoch cuando se reemplaza la lista entera;
+    # con la misma epoch basta leer los jugadores con seq nuevo.
+    SCHEMA=("CREATE TABLE IF NOT EXISTS meta(key TEXT PRIMARY KEY, value INTEGER NOT NULL)",
+            "CREATE TABLE IF NOT EXISTS players(seq INTEGER PRIMARY KEY AUTOINCREMENT, slug TEXT NOT NULL, data TEXT NOT NULL)",
+            "CREATE INDEX IF NOT EXISTS players_slug ON players(slug)",
+            "CREATE TABLE IF NOT EXISTS catalog(key TEXT PRIMARY KEY, question TEXT NOT NULL)")
+
+    def __init__(self, path):
+        super().__init__(path)
+        self.journal_path=None; self.lock=FileLock(None); self.db=None; self.epoch=None
+
+    def _conn(self):
+        if self.db is None:
+            import sqlite3
+            db=sqlite3.connect(self.path, timeout=SQLITE_TIMEOUT_S, isolation_level=None, check_same_thread=False)
+            db.execute("PRAGMA journal_mode=WAL"); db.execute("PRAGMA synchronous=NORMAL")
+            with self._txn(db):
+                for sql in self.SCHEMA: db.execute(sql)
+                if db.execute("SELECT value FROM meta WHERE key='version'").fetchone() is None: self._seed(db)
+            self.db=db
+        return self.db
+
+    @staticmethod
+    @contextlib.contextmanager
+    def _txn(db):
+        # BEGIN IMMEDIATE: el cerrojo de escritura se toma al empezar, no a mitad
+        db.execute("BEGIN IMMEDIATE")
+        try: yield db
+        except BaseException: db.execute("ROLLBACK"); raise
+        db.execute("UPDATE meta SET value=value+1 WHERE key='version'"); db.execute("COMMIT")
+
+    def _seed(self, db):
+        # base nueva: parte del JSON hermano si lo hay (futbol_dataset.json)
+        src=os.path.splitext(self.path)[0]+".json"
+        data=DatasetStore(src).read() if os.path.exists(src) else _normalize_dataset({"catalog": DEFAULT_FEATURE_LIBRARY.copy()})
+        db.executemany("INSERT INTO meta VALUES(?,0)", [("version",), ("epoch",)])
+        db.executemany("INSERT INTO catalog VALUES(?,?)", list(data["catalog"].items()))
+        self._insert_players(db, data["personajes"])
+
+    @staticmethod
+    def _insert_players(db, personajes):
+        names=[p.get("nombre","") for p in personajes]
+        db.executemany("INSERT INTO players(slug, data) VALUES(?,?)",
+                       zip(_slugify_many(names), (json.dumps(p, ensure_ascii=False) for p in personajes)))
+
+    def _file_stat(self):
+        v=dict(self._conn().execute("SELECT key, value FROM meta"))
+        return ((v["epoch"], v["version"]), None)
+
+    def _refresh(self, need_data=True):
+        cur=self._file_stat()
+        if self.data is None or cur[0][0]!=self.epoch: return self._load()
+        if cur==self.stat: return
+        db=self.db; n=0
+        for seq,raw in db.execute("SELECT seq, data FROM players WHERE seq>? ORDER BY seq", (self.seq,)):
+            self._apply({"op":"player", "data":json.loads(raw)}); self.seq=seq; n+=1
+        self.data["catalog"]=dict(db.execute("SELECT key, question FROM catalog ORDER BY rowid"))
+        self.merges+=1; self._changed(); self.stat=cur
+
+    def _load(self):
+        db=self._conn()
+        db.execute("BEGIN")  # instantánea coherente entre las consultas
+        try:
+            self.stat=self._file_stat(); self.epoch=self.stat[0][0]
+            rows=db.execute("SELECT seq, data FROM players ORDER BY seq").fetchall()
+            catalog=dict(db.execute("SELECT key, question FROM catalog ORDER BY rowid"))
+        finally: db.execute("COMMIT")
+        self.data=_normalize_dataset({"catalog": catalog, "personajes": [json.loads(raw) for _,raw in rows]})
+        self.seq=rows[-1][0] if rows else 0
+        self.loads+=1; self._changed(); self.text=None; self.stats=None; self.slugs=None
+
+    def bin_source(self): return [self.epoch] if self.epoch is not None else None
+
+    def tail_since(self, source, seq):
+        # jugadores con seq posterior y el catálogo entero (reemplazarlo sube la epoch);
+        # sin compactación que cambie la fuente, una cola larga también pide recompilar
+        if not source or seq is None: return None
+        with self.lock:
+            db=self._conn(); db.execute("BEGIN")
+            try:
+                if [self._file_stat()[0][0]]!=list(source): return None
+                rows=db.execute("SELECT data FROM players WHERE seq>? ORDER BY seq LIMIT ?",
+                                (seq, JOURNAL_COMPACT_EVERY+1)).fetchall()
+                if len(rows)>JOURNAL_COMPACT_EVERY: return None
+                catalog=dict(db.execute("SELECT key, question FROM catalog ORDER BY rowid"))
+            finally: db.execute("COMMIT")
+        return [_normalize_player(json.loads(raw)) for raw, in rows], catalog
+
+    def _has_name(self, name):
+        return self.db.execute("SELECT 1 FROM players WHERE slug=? LIMIT 1", (slugify(name),)).fetchone() is not None
+
+    def _append(self, entry, unique=None):
+        with self.lock:
+            db=self._conn()
+            with self._txn(db):
+                if entry["op"]=="catalog":
+                    db.execute("INSERT INTO catalog VALUES(?,?) ON CONFLICT(key) DO UPDATE SET question=excluded.question",
+                               (entry["key"], entry["question"]))
+                elif unique is not None and self._has_name(unique): return False
+                else: self._insert_players(db, [entry["data"]])
+            if self.data is not None: self._refresh()
+        return True
+
+    def append_batch(self, entries):
+        with self.lock:
+            db=self._conn()
+            with self._txn(db):
+                for e in entries:
+                    if e["op"]=="catalog":
+                        db.execute("INSERT INTO catalog VALUES(?,?) ON CONFLICT(key) DO UPDATE SET question=excluded.question",
+                                   (e["key"], e["question"]))
+                    else: self._insert_players(db, [e["data"]])
+            self.data=None; self.streaming=True; self._changed()
+
+    def update(self, **fields):
+        with self.lock:
+            db=self._conn()
+            with self._txn(db):
+                if "catalog" in fields:
+                    db.execute("DELETE FROM catalog")
+                    db.executemany("INSERT INTO catalog VALUES(?,?)", list(dict(fields["catalog"]).items()))
+                    db.execute("UPDATE meta SET value=value+1 WHERE key='epoch'")  # el binario no puede fusionar borrados
+                if "personajes" in fields:
+                    db.execute("DELETE FROM players")
+                    self._insert_players(db, _normalize_dataset({"personajes": fields["personajes"]})["personajes"])
+                    db.execute("UPDATE meta SET value=value+1 WHERE key='epoch'")
+            self._refresh()
+
+    def compact(self):
+        # no hay journal propio: se vuelca el WAL a la base
+        with self.lock: self._conn().execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    def flush(self): return False
+
+_STORE=None
+def _store():
+    global _STORE
+    if _STORE is None or _STORE.path!=DATAFILE:
+        _STORE=(SqliteStore if DATAFILE.lower().endswith(SQLITE_SUFFIXES) else DatasetStore)(DATAFILE)
+    return _STORE
 
-def load_catalog(): return read_data().get("catalog", {})
-def save_catalog(new_catalog):
-    data = read_data(); data["catalog"] = new_catalog or {}; write_data(data)
-def load_dataset(): return read_data().get("personajes", [])
-def save_dataset(personajes):
-    data = read_data(); data["personajes"] = personajes; write_data(data)
+def read_data():
+    data=_store().read()
+    return {"catalog": data["catalog"], "personajes": data["personajes"]}
 
-def build_domains(personajes):
-    dom={}
+def write_data(data):
+    _store().update(catalog=data.get("catalog") or {}, personajes=list(data.get("personajes", [])))
+
+def load_catalog(): return dict(read_data().get("catalog", {}))
+def save_catalog(new_catalog): _store().update(catalog=dict(new_catalog or {}))
+def load_dataset(): return list(read_data().get("personajes", []))
+def save_dataset(personajes): _store().update(personajes=list(personajes))
+def add_player(p, unique=False): return _store().add_player(p, unique)
+def add_catalog_entry(key, question): _store().add_catalog_entry(key, question)
+def compact_dataset(): _store().compact()
+def domain_stats(): return _store().domain_stats()
+
+class DomainStats:
+    # Conteos (attr, valor) -> jugadores y dominios ordenados, mantenidos al
+    # añadir jugadores en vez de recorrer el roster. counts[a] guarda los
+    # valores en orden de primera aparición, como value_counts.
+    def __init__(self):
+        self.n=0; self.counts={}; self.totals={}
+        self.dominios={k:[] for k in CORE_ATTRS}
+
+    @classmethod
+    def of(cls, personajes):
+        st=cls()
+        if not isinstance(personajes, RosterColumns):
+            for p in personajes: st.add(p.get("atributos",{}))
+            return st
+        cols=personajes; st.n=cols.n
+        if cols.tail is not None:
+            # columnas extendidas con el journal: conteos de la base (del binario) más la cola
+            base, players = cols.tail
+            st=cls.of(base); cols.tail=None
+            for p in players: st.add(p.get("atributos",{}))
+            return st
+        for a in cols.attrs:
+            vals=cols.values[a]
+            if cols.postings is not None:  # binario: el inicio de cada código ya da el conteo
+                start=cols.postings[a][1]; per=[start[c+1]-start[c] for c in range(len(vals))]
+            elif numpy_ok():
+                col=cols.np_column(a); per=np.bincount(col[col>=0], minlength=len(vals)).tolist()
+            else:
+                cnt=Counter(cols.col[a]); per=[cnt[c] for c in range(len(vals))]
+            st.counts[a]={v:k for v,k in zip(vals, per) if k}; st.totals[a]=sum(per)
+            st.dominios[a]=sorted(st.counts[a], key=str)
+        return st
+
+    def add(self, attrs):
+        self.n+=1
+        for a,v in attrs.items():
+            cnt=self.counts.setdefault(a, {})
+            if v not in cnt: bisect.insort(self.dominios.setdefault(a, []), v, key=str); cnt[v]=0
+            cnt[v]+=1; self.totals[a]=self.totals.get(a,0)+1
+
+    def domains(self): return {k:list(v) for k,v in self.dominios.items()}
+
+def build_domains(personajes): return DomainStats.of(personajes).domains()
+
+# ---------------- Roster columnar ----------------
+_MISSING=object()
+
+class RosterColumns:
+    # Roster en columnas: nombres en una tabla UTF-8 con desplazamientos, un
+    # array de códigos por atributo (-1 = sin dato; int8 y crece a int16/int32
+    # si hacen falta más valores) con los valores internados en orden de
+    # aparición, y bitset de ausentes por atributo. Se indexa como la lista de
+    # jugadores de siempre, pero cada jugador es un PlayerView creado al vuelo.
+    _GROW={"b":(127,"h"), "h":(32767,"i"), "i":(2**31-1,"i")}
+
+    def __init__(self, personajes=()):
+        self.name_blob=bytearray(); self.name_off=array("q",[0]); self.extra={}
+        self.col={}; self.values={}; self.code={}; self.missing={}; self.n=0
+        self._extend(personajes)
+        self.postings=None; self.mm=None; self._digest=None; self._names=None; self.tail=None
+
+    def _extend(self, personajes):
+        n0=n=self.n
+        for p in personajes:
+            self.name_blob+=str(p.get("nombre","")).encode("utf-8"); self.name_off.append(len(self.name_blob))
+            rest={k:v for k,v in p.items() if k not in ("nombre","atributos")}
+            if rest: self.extra[n]=rest
+            for k,v in p.get("atributos",{}).items():
+                col=self.col.get(k)
+                if col is None: col=self.col[k]=array("b"); self.values[k]=[]; self.code[k]={}
+                tab=self.code[k]; c=tab.get(v)
+                if c is None:
+                    c=tab[v]=len(tab); self.values[k].append(v)
+                    if c>self._GROW[col.typecode][0]: col=self.col[k]=array(self._GROW[col.typecode][1], col)
+                if len(col)<n: col.extend(array(col.typecode,[-1])*(n-len(col)))
+                col.append(c)
+            n+=1
+        self.n=n; self.attrs=sorted(self.col)
+        for k,col in self.col.items():
+            if len(col)<n: col.extend(array(col.typecode,[-1])*(n-len(col)))
+            old=self.missing.get(k)
+            if old is None: self.missing[k]=_bits_from_rows([i for i,c in enumerate(col) if c<0], n)
+            else: self.missing[k]=old|_bits_from_rows([i for i in range(n0, n) if col[i]<0], n)
+
+    def extended(self, personajes):
+        # estas filas (las del binario incluidas) más las nuevas del journal:
+        # un memcpy por columna, sin leer el JSON ni reescribir el binario
+        personajes=list(personajes)
+        out=RosterColumns.__new__(RosterColumns); n0=self.n
+        out.name_blob=bytearray(self.name_blob); out.name_off=_array_copy("q", self.name_off)
+        out.extra=dict(self.extra); out.missing=dict(self.missing); out.n=n0
+        out.col={a:_array_copy(_typecode(c), c) for a,c in self.col.items()}
+        out.values={a:list(v) for a,v in self.values.items()}; out.code={a:dict(c) for a,c in self.code.items()}
+        out._extend(personajes)
+        out.postings=None; out.mm=None; out._names=None; out.tail=(self, personajes)  # para DomainStats.of
+        # el hash de las filas se encadena: el de la base viene del binario
+        out._digest=hashlib.sha1(f"{self.digest()}\n{players_digest(personajes)}".encode()).hexdigest() if personajes else self._digest
+        if self._names is not None and personajes: out._names=_NamesWithTail(self._names, out, n0)
+        elif not personajes: out._names=self._names
+        return out
+
+    def __len__(self): return self.n
+
+    def __getitem__(self, i):
+        if isinstance(i, slice): return PlayerRows(self, list(range(*i.indices(self.n))))
+        if i<0: i+=self.n
+        if not 0<=i<self.n: raise IndexError(i)
+        return PlayerView(self, i)
+
+    def __iter__(self): return (PlayerView(self, i) for i in range(self.n))
+
+    def name(self, i):
+        return str(self.name_blob[self.name_off[i]:self.name_off[i+1]], "utf-8")
+
+    def names(self):
+        # NameIndex de estas filas: viene del binario o se construye al primer uso
+        with _NAMES_LOCK:
+            if self._names is None: self._names=NameIndex.build(self)
+            return self._names
+
+    def np_column(self, attr):
+        # vista NumPy sin copia del array de códigos
+        col=self.col[attr]
+        return np.frombuffer(col, dtype=np.dtype(_typecode(col))) if len(col) else np.zeros(0, dtype=np.int8)
+
+    def rows_bits(self, attr, code):
+        # bitset de las filas con ese código (de la lista invertida si viene del binario)
+        if self.postings is not None:
+            rows, start = self.postings[attr]
+            return _bits_from_rows(rows[start[code]:start[code+1]], self.n)
+        if numpy_ok():
+            b=np.packbits(self.np_column(attr)==code, bitorder="little")
+            return int.from_bytes(b.tobytes(), "little")
+        col=self.col[attr]
+        return _bits_from_rows([i for i,c in enumerate(col) if c==code], self.n)
+
+    def counts(self, rows, attr):
+        # {valor: veces} en esas filas, en orden de primera aparición (como value_counts)
+        col=self.col.get(attr)
+        if col is None: return {}
+        vals=self.values[attr]; cnt=Counter(map(col.__getitem__, rows)); cnt.pop(-1, None)
+        return {vals[c]:k for c,k in cnt.items()}
+
+    def match_scores(self, rows, hechos):
+        # score_candidate de cada fila: cuántos hechos cumple
+        sc=[0]*len(rows)
+        for a,v in hechos.items():
+            col=self.col.get(a); c=self.code.get(a,{}).get(v)
+            if col is None or c is None: continue
+            sc=list(map(operator.add, sc, map(c.__eq__, map(col.__getitem__, rows))))
+        return sc
+
+    def filter(self, hechos, neg):
+        rows=range(self.n)
+        for a,v in hechos.items():
+            col=self.col.get(a)
+            if col is None: continue
+            c=self.code[a].get(v, -2)
+            rows=[i for i in rows if col[i] in (-1, c)]
+        for a,v in neg:
+            col=self.col.get(a); c=self.code.get(a,{}).get(v)
+            if col is None or c is None: continue
+            rows=[i for i in rows if col[i]!=c]
+        return PlayerRows(self, list(rows))
+
+    def digest(self):
+        # sha1 del JSON canónico de los jugadores (lo usa dataset_hash)
+        if self._digest is None: self._digest=players_digest(p.to_dict() for p in self)
+        return self._digest
+
+    # Formato binario: MAGIC, largo de la cabecera (u64), cabecera JSON y
+    # secciones alineadas a 8 bytes (desplazamientos relativos a su inicio):
+    # tabla de nombres, columna de códigos, bitset de ausentes y lista
+    # invertida (filas ordenadas por código + inicio de cada código) por
+    # atributo, y los arrays del NameIndex. open_bin lo mapea con mmap y usa
+    # las secciones sin copiarlas.
+    BIN_MAGIC=b"AKROSTR1"
+
+    def save_bin(self, path, catalog, source=None, seq=None):
+        sections=[]; pos=0
+        def add(buf):
+            nonlocal pos
+            b=bytes(buf); ref=[pos, len(b)]
+            sections.append(b); pad=-len(b)%8
+            if pad: sections.append(bytes(pad))
+            pos+=len(b)+pad
+            return ref
+        head={"n":self.n, "catalog":catalog, "source":source, "seq":seq, "digest":self.digest(),
+              "name_off":add(array("q", self.name_off)), "name_blob":add(self.name_blob),
+              "extra":{str(i):e for i,e in self.extra.items()}, "attrs":[]}
+        for a in self.attrs:
+            col=self.col[a]; nv=len(self.values[a])
+            buckets=[array("i") for _ in range(nv)]
+            for i,c in enumerate(col):
+                if c>=0: buckets[c].append(i)
+            start=array("q",[0])
+            for b in buckets: start.append(start[-1]+len(b))
+            head["attrs"].append({"name":a, "type":_typecode(col), "values":self.values[a],
+                                  "col":add(col), "missing":add(self.missing[a].to_bytes((self.n+7)//8, "little")),
+                                  "post_rows":add(b"".join(b.tobytes() for b in buckets)), "post_start":add(start)})
+        names=self.names()
+        head["names"]={f:add(memoryview(getattr(names, f)).cast("B")) for f,_ in NameIndex.FIELDS}
+        hb=json.dumps(head, ensure_ascii=False, separators=(",",":")).encode("utf-8")
+        d=os.path.dirname(os.path.abspath(path))
+        fd,tmp=tempfile.mkstemp(prefix=".tmp_", suffix=".bin", dir=d)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(self.BIN_MAGIC); f.write(len(hb).to_bytes(8, "little")); f.write(hb); f.write(bytes(-len(hb)%8))
+                for b in sections: f.write(b)
+                f.flush(); os.fsync(f.fileno())
+            _keep_mode(tmp, path); os.replace(tmp, path)  # legible por los workers de otros usuarios
+        except BaseException:
+            try: os.unlink(tmp)
+            except OSError: pass
+            raise
+
+    @classmethod
+    def open_bin(cls, path):
+        # -> (columnas, catálogo, cabecera); ValueError si no es un roster compilado
+        with open(path, "rb") as f:
+            mm=mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if mm[:8]!=cls.BIN_MAGIC: raise ValueError("no es un roster compilado")
+        hlen=int.from_bytes(mm[8:16], "little")
+        head=json.loads(mm[16:16+hlen].decode("utf-8"))
+        base=16+hlen+(-hlen%8); mv=memoryview(mm)
+        def sec(ref, fmt="B"): return mv[base+ref[0]:base+ref[0]+ref[1]].cast(fmt)
+        cols=cls.__new__(cls)
+        cols.n=n=head["n"]; cols.mm=mm
+        cols.name_off=sec(head["name_off"], "q"); cols.name_blob=sec(head["name_blob"])
+        cols.extra={int(i):e for i,e in head["extra"].items()}
+        cols.col={}; cols.values={}; cols.code={}; cols.missing={}; cols.postings={}; cols.tail=None
+        for e in head["attrs"]:
+            a=e["name"]; cols.values[a]=e["values"]; cols.code[a]={v:i for i,v in enumerate(e["values"])}
+            cols.col[a]=sec(e["col"], e["type"])
+            cols.missing[a]=int.from_bytes(sec(e["missing"]), "little")
+            cols.postings[a]=(sec(e["post_rows"], "i"), sec(e["post_start"], "q"))
+        cols.attrs=sorted(cols.col); cols._digest=head["digest"]; cols._names=None
+        if "names" in head:  # binarios anteriores: se construye al primer uso
+            cols._names=NameIndex(cols, **{f:sec(head["names"][f], t) for f,t in NameIndex.FIELDS})
+        if len(cols.name_off)!=n+1 or any(len(c)!=n for c in cols.col.values()): raise ValueError("roster compilado inconsistente")
+        return cols, head["catalog"], head
+
+def _array_copy(typecode, buf):
+    a=array(typecode)
+    if len(buf): a.frombytes(memoryview(buf).cast("B"))
+    return a
+
+def _typecode(col):
+    # array.typecode o memoryview.format (columnas mapeadas del binario)
+    return getattr(col, "typecode", None) or col.format
+
+def players_digest(personajes):
+    h=hashlib.sha1()
     for p in personajes:
-        for k,v in p.get("atributos",{}).items():
-            dom.setdefault(k,set()).add(v)
-    for k in CORE_ATTRS: dom.setdefault(k,set())
-    return {k: sorted(list(v), key=lambda x: str(x)) for k,v in dom.items()}
+        h.update(json.dumps(p, ensure_ascii=False, sort_keys=True).encode("utf-8")); h.update(b"\n")
+    return h.hexdigest()
+
+def roster_bin_path(datafile=None):
+    return os.path.splitext(datafile or DATAFILE)[0]+ROSTER_BIN_SUFFIX
+
+def load_roster_columns(compile=False):
+    # -> (RosterColumns, catálogo). Usa el binario mapeado mientras el JSON
+    # principal sea el mismo con el que se compiló; lo que el journal añadió
+    # después va encima (extended) sin tocar el disco. Se recompila al cambiar
+    # el JSON (compactación, update) o con --compile-roster.
+    st=_store(); path=roster_bin_path(st.path)
+    try: cols, catalog, head = (None, None, {}) if compile else RosterColumns.open_bin(path)
+    except (OSError, ValueError, KeyError): cols=None
+    tail=st.tail_since(head.get("source"), head.get("seq")) if cols is not None else None
+    if tail is not None:
+        players, cat = tail
+        return (cols.extended(players) if players else cols), {**catalog, **cat}
+    data=st.read()
+    cols=RosterColumns(data.get("personajes", [])); catalog=dict(data.get("catalog", {}))
+    try: cols.save_bin(path, catalog, st.bin_source(), st.seq)
+    except OSError: pass  # directorio de solo lectura o binario abierto en Windows: seguimos en memoria
+    return cols, catalog
+
+class PlayerRows(Sequence):
+    # Lista de jugadores (filas) de un RosterColumns; las vistas se crean al
+    # leerlas, así un conjunto grande de candidatos es solo una lista de ints.
+    __slots__=("cols","rows")
+    def __init__(self, cols, rows): self.cols=cols; self.rows=rows
+
+    def __len__(self): return len(self.rows)
+
+    def __getitem__(self, j):
+        if isinstance(j, slice): return PlayerRows(self.cols, self.rows[j])
+        return PlayerView(self.cols, self.rows[j])
+
+    def __iter__(self): return map(partial(PlayerView, self.cols), self.rows)
+
+    def __repr__(self): return f"PlayerRows({len(self.rows)} jugadores)"
+
+class AttrsView(Mapping):
+    # atributos de una fila, de solo lectura
+    __slots__=("cols","i")
+    def __init__(self, cols, i): self.cols=cols; self.i=i
+
+    def get(self, k, default=None):
+        col=self.cols.col.get(k)
+        if col is None: return default
+        c=col[self.i]
+        return default if c<0 else self.cols.values[k][c]
+
+    def __getitem__(self, k):
+        v=self.get(k, _MISSING)
+        if v is _MISSING: raise KeyError(k)
+        return v
+
+    def __contains__(self, k):
+        col=self.cols.col.get(k)
+        return col is not None and col[self.i]>=0
+
+    def __iter__(self):
+        i=self.i; col=self.cols.col
+        return (a for a in self.cols.attrs if col[a][i]>=0)
+
+    def __len__(self): return sum(1 for _ in self)
+
+class PlayerView:
+    # Jugador de un RosterColumns; se usa como el dict {"nombre","atributos",
+    # "confirm",...} de siempre (get, [], in) y to_dict() lo reconstruye.
+    __slots__=("cols","i")
+    def __init__(self, cols, i): self.cols=cols; self.i=i
+
+    def get(self, key, default=None):
+        if key=="nombre": return self.cols.name(self.i)
+        if key=="atributos": return AttrsView(self.cols, self.i)
+        return self.cols.extra.get(self.i, {}).get(key, default)
+
+    def __getitem__(self, key):
+        v=self.get(key, _MISSING)
+        if v is _MISSING: raise KeyError(key)
+        return v
+
+    def __contains__(self, key): return key in ("nombre","atributos") or key in self.cols.extra.get(self.i, {})
+
+    def keys(self): return ["nombre","atributos",*self.cols.extra.get(self.i, {})]
+
+    def items(self): return [(k, self[k]) for k in self.keys()]
+
+    def to_dict(self):
+        d={"nombre":self.cols.name(self.i), "atributos":dict(AttrsView(self.cols, self.i))}
+        d.update(self.cols.extra.get(self.i, {}))
+        return d
+
+    def __eq__(self, other): return isinstance(other, PlayerView) and other.cols is self.cols and other.i==self.i
+
+    def __hash__(self): return hash((id(self.cols), self.i))
+
+    def __repr__(self): return f"PlayerView({self.to_dict()!r})"
+
+# ---------------- Nombres ----------------
+_NAMES_LOCK=threading.Lock()
+
+def _slug_key(slug):
+    # hash estable de 8 bytes (se guarda en el binario) como int64 con signo
+    return int.from_bytes(hashlib.blake2b(slug.encode("utf-8"), digest_size=8).digest(), "little", signed=True)
+
+def _trigram_keys(slug):
+    p=f"  {slug} "
+    return {(ord(p[j])<<42)|(ord(p[j+1])<<21)|ord(p[j+2]) for j in range(len(p)-2)}
+
+class NameIndex:
+    # Jugadores por nombre. Exacto y por slug: hashes de slug ordenados con su
+    # fila (12 bytes por jugador, búsqueda binaria). Aproximado: índice
+    # invertido de trigramas del slug en CSR (trigrama -> filas ordenadas) y
+    # Jaccard entre conjuntos de trigramas.
+    FIELDS=(("slug_keys","q"), ("slug_rows","i"), ("tri_keys","q"), ("tri_start","q"), ("tri_rows","i"), ("ntri","H"))
+
+    def __init__(self, cols, **arrays):
+        self.cols=cols
+        for f,t in self.FIELDS:
+            a=arrays[f]
+            setattr(self, f, np.frombuffer(a, dtype=np.dtype(t)) if numpy_ok() and len(a) else a)
+
+    @classmethod
+    def build(cls, cols):
+        n=cols.n; slugs=_slugify_many([cols.name(i) for i in range(n)])
+        keys=[_slug_key(x) for x in slugs]
+        order=sorted(range(n), key=keys.__getitem__)
+        out={"slug_keys":array("q", (keys[i] for i in order)), "slug_rows":array("i", order)}
+        if numpy_ok() and n:
+            c=np.frombuffer("\n".join(f"  {x} " for x in slugs).encode("utf-32-le"), dtype=np.uint32).astype(np.int64)
+            ok=(c[:-2]!=10)&(c[1:-1]!=10)&(c[2:]!=10)
+            k=((c[:-2]<<42)|(c[1:-1]<<21)|c[2:])[ok]; r=np.cumsum(c==10)[:-2][ok]
+            o=np.lexsort((r,k)); k=k[o]; r=r[o]
+            keep=np.ones(len(k), dtype=bool); keep[1:]=(k[1:]!=k[:-1])|(r[1:]!=r[:-1]); k=k[keep]; r=r[keep]
+            tk,first=np.unique(k, return_index=True)
+            out.update(tri_keys=array("q", tk.tobytes()), tri_start=array("q", np.append(first, len(k)).astype(np.int64).tobytes()),
+                       tri_rows=array("i", r.astype(np.int32).tobytes()),
+                       ntri=array("H", np.minimum(np.bincount(r, minlength=n), 65535).astype(np.uint16).tobytes()))
+        else:
+            post={}; ntri=array("H")
+            for r,x in enumerate(slugs):
+                g=_trigram_keys(x); ntri.append(min(len(g), 65535))
+                for k in g: post.setdefault(k, array("i")).append(r)
+            tk=array("q", sorted(post)); start=array("q",[0]); rows=array("i")
+            for k in tk: rows.extend(post[k]); start.append(len(rows))
+            out.update(tri_keys=tk, tri_start=start, tri_rows=rows, ntri=ntri)
+        return cls(cols, **out)
+
+    def _slug_rows(self, slug):
+        h=_slug_key(slug)
+        lo=bisect.bisect_left(self.slug_keys, h); hi=bisect.bisect_right(self.slug_keys, h, lo)
+        return [int(self.slug_rows[j]) for j in range(lo, hi)]
+
+    def find(self, name):
+        # primera fila con exactamente ese nombre, o None
+        name=str(name)
+        return next((r for r in sorted(self._slug_rows(slugify(name))) if self.cols.name(r)==name), None)
+
+    def by_slug(self, name):
+        # filas cuyo nombre da el mismo slug ("Núñez" == "nunez")
+        x=slugify(str(name))
+        return sorted(r for r in self._slug_rows(x) if slugify(self.cols.name(r))==x)
+
+    def _posting(self, key):
+        j=bisect.bisect_left(self.tri_keys, key)
+        if j<len(self.tri_keys) and self.tri_keys[j]==key: return self.tri_rows[self.tri_start[j]:self.tri_start[j+1]]
+        return self.tri_rows[0:0]
+
+    def similar(self, name, limit=None, min_sim=None):
+        # -> [(fila, Jaccard de trigramas)] de mayor a menor, empates por fila
+        limit=FUZZY_LIMIT if limit is None else limit; min_sim=FUZZY_MIN_SIM if min_sim is None else min_sim
+        x=slugify(str(name))
+        if not x or not self.cols.n: return []
+        q=_trigram_keys(x); posts=sorted((self._posting(k) for k in q), key=len)
+        # sim >= min_sim obliga a compartir need trigramas, así que todo
+        # resultado está en alguno de los len(q)-need+1 más raros
+        need=max(1, math.ceil(min_sim*len(q)))
+        prefix=[p for p in posts[:len(q)-need+1] if len(p)]
+        if not prefix: return []
+        if isinstance(self.tri_rows, array) or not numpy_ok():
+            cands=sorted(set().union(*prefix)); cnt=Counter()
+            for p in posts:
+                have=set(p); cnt.update(c for c in cands if c in have)
+            sims=[(cnt[c]/(len(q)+self.ntri[c]-cnt[c]), c) for c in cands]
+            sims=[(c,sm) for sm,c in sims if sm>=min_sim]
+            return heapq.nsmallest(limit, sims, key=lambda t: (-t[1], t[0]))
+        # ScanCount: un bincount sobre las listas de todos los trigramas de la consulta
+        cnt=np.bincount(np.concatenate([p for p in posts if len(p)]), minlength=self.cols.n)
+        cands=np.flatnonzero(cnt>=need); cnt=cnt[cands]
+        sim=cnt/(len(q)+self.ntri[cands].astype(np.int64)-cnt)
+        o=np.flatnonzero(sim>=min_sim)
+        if len(o)>limit: o=o[sim[o]>=-np.partition(-sim[o], limit-1)[limit-1]]  # los empatados en el corte también
+        o=o[np.lexsort((cands[o], -sim[o]))][:limit]
+        return [(int(cands[j]), float(sim[j])) for j in o]
+
+class _RowsSlice:
+    # las filas lo.. de unas columnas, para indexar solo sus nombres
+    def __init__(self, cols, lo): self.cols=cols; self.lo=lo; self.n=cols.n-lo
+    def name(self, i): return self.cols.name(self.lo+i)
+
+class _NamesWithTail:
+    # NameIndex del binario + uno pequeño con las filas que el journal añadió después
+    def __init__(self, base, cols, lo):
+        self.base=base; self.cols=cols; self.lo=lo; self.tail=NameIndex.build(_RowsSlice(cols, lo))
+
+    def find(self, name):
+        r=self.base.find(name)
+        if r is not None: return r
+        r=self.tail.find(name)
+        return None if r is None else r+self.lo
+
+    def by_slug(self, name): return self.base.by_slug(name)+[r+self.lo for r in self.tail.by_slug(name)]
+
+    def similar(self, name, limit=None, min_sim=None):
+        limit=FUZZY_LIMIT if limit is None else limit
+        out=self.base.similar(name, limit, min_sim)+[(r+self.lo, sm) for r,sm in self.tail.similar(name, limit, min_sim)]
+        return heapq.nsmallest(limit, out, key=lambda t: (-t[1], t[0]))
 
 # ---------------- Motor ----------------
 def filter_candidates(personajes, hechos, neg):
+    if isinstance(personajes, RosterColumns): return personajes.filter(hechos, neg)
     out=[]
     for p in personajes:
         attrs=p.get("atributos",{})
@@ -125,6 +1091,174 @@ def filter_candidates(personajes, hechos, neg):
         if ok: out.append(p)
     return out
 
+# ---------------- Índice (bitsets) ----------------
+def _bits_from_rows(rows, n):
+    buf=bytearray((n+7)//8)
+    for i in rows: buf[i>>3]|=1<<(i&7)
+    return int.from_bytes(buf,"little")
+
+def fact_of(q, ans):
+    # (attr, valor) que fija/niega una respuesta; None si no aporta ("No sé")
+    if ans is None: return None
+    if q[0]=='bool': return (q[1], True)
+    return (q[1], q[2])
+
+class RosterIndex:
+    # Índice invertido (attr, valor) -> bitset de filas del roster.
+    # El bit i representa personajes[i]; los candidatos vivos son un int.
+    # Los bitsets por valor se sacan de las columnas al primer uso y viven
+    # en un LRU: con 10⁶ jugadores y miles de clubes no caben todos.
+    _uids=itertools.count()
+
+    def __init__(self, personajes, cache_size=None):
+        self.cols=cols=personajes if isinstance(personajes, RosterColumns) else RosterColumns(personajes)
+        self.personajes=cols; self.uid=next(self._uids)
+        self.all=(1<<cols.n)-1
+        self.has={k:self.all & ~cols.missing[k] for k in cols.attrs}
+        self.stats=DomainStats.of(cols)
+        self.cache_size=BITSET_CACHE_SIZE if cache_size is None else cache_size
+        self._bits=OrderedDict(); self._lock=threading.Lock(); self.hits=self.misses=0
+
+    def bitset(self, a, v):
+        key=(a,v)
+        with self._lock:
+            b=self._bits.get(key)
+            if b is not None: self._bits.move_to_end(key); self.hits+=1; return b
+            self.misses+=1
+        c=self.cols.code.get(a,{}).get(v)
+        b=0 if c is None else self.cols.rows_bits(a, c)
+        with self._lock:
+            self._bits[key]=b
+            while len(self._bits)>self.cache_size: self._bits.popitem(last=False)
+        return b
+
+    def keep_fact(self, a, v):
+        # quien tiene a==v o no tiene el atributo (igual que filter_candidates)
+        return self.bitset(a,v) | (self.all & ~self.has.get(a,0))
+
+    def narrow(self, mask, q, ans):
+        f=fact_of(q, ans)
+        if f is None: return mask
+        if ans is True: return mask & self.keep_fact(*f)
+        return mask & ~self.bitset(*f)
+
+    def mask_for(self, hechos, neg):
+        mask=self.all
+        for k,v in hechos.items(): mask&=self.keep_fact(k,v)
+        for kv in neg: mask&=~self.bitset(*kv)
+        return mask
+
+    def row_ids(self, mask):
+        if not mask: return []
+        if numpy_ok(): return self.rows(mask).tolist()
+        s=bin(mask)[:1:-1]
+        out=[]; i=s.find('1')
+        while i>=0:
+            out.append(i); i=s.find('1',i+1)
+        return out
+
+    def members(self, mask): return PlayerRows(self.cols, self.row_ids(mask))
+
+    # Puntuación de coincidencia (score_candidate) en rebanadas de bits:
+    # levels[k] = filas que cumplen al menos k hechos, levels[0] = todas.
+    # Sumar un hecho es un acarreo por nivel; nadie se repuntúa desde cero.
+    def match_levels(self, hechos):
+        levels=(self.all,)
+        for a,v in hechos.items(): levels=self.add_match(levels, a, v)
+        return levels
+
+    def add_match(self, levels, a, v):
+        b=self.bitset(a,v)
+        return (levels[0],)+tuple(levels[k]|(levels[k-1]&b) for k in range(1,len(levels)))+(levels[-1]&b,)
+
+    def top_rows(self, levels, mask, k=2):
+        # hasta k (fila, puntos) de mayor puntuación, empates por orden de fila
+        out=[]; taken=0
+        for s in range(len(levels)-1, -1, -1):
+            x=levels[s]&mask&~taken
+            while x and len(out)<k:
+                low=x&-x; out.append((low.bit_length()-1, s)); taken|=low; x^=low
+            if len(out)>=k: break
+        return out
+
+    def score_sum(self, levels, mask):
+        return sum((l&mask).bit_count() for l in levels[1:])
+
+    def count(self, mask): return mask.bit_count()
+
+    def digest(self, mask):
+        return hashlib.blake2b(mask.to_bytes((mask.bit_length()+7)//8,"little"), digest_size=16).digest()
+
+    def rows(self, mask):
+        n=self.cols.n
+        b=np.frombuffer(mask.to_bytes((n+7)//8 or 1,"little"), dtype=np.uint8)
+        return np.flatnonzero(np.unpackbits(b, bitorder="little")[:n])
+
+    def matrix(self):
+        if getattr(self,"_matrix",None) is None: self._matrix=AttrMatrix(self.cols)
+        return self._matrix
+
+# ---------------- Scorer NumPy ----------------
+class AttrMatrix:
+    # Columnas del RosterColumns en una matriz (-1 = ausente) y códigos
+    # globales consecutivos por atributo para histogramas con un solo bincount.
+    def __init__(self, cols):
+        if not isinstance(cols, RosterColumns): cols=RosterColumns(cols)
+        attrs=cols.attrs
+        self.attrs=attrs; self.col={a:i for i,a in enumerate(attrs)}; self.values=[]
+        dtype=np.result_type(np.int8, *(np.dtype(_typecode(cols.col[a])) for a in attrs))
+        codes=np.full((cols.n, max(len(attrs),1)), -1, dtype=dtype)
+        for c,a in enumerate(attrs): codes[:,c]=cols.np_column(a)
+        offs, isbool, code_col = [], [], []
+        for c,a in enumerate(attrs):
+            offs.append(len(self.values))
+            for v in cols.values[a]:
+                self.values.append(v); isbool.append(type(v) is bool); code_col.append(c)
+        self.offsets=np.array(offs, dtype=np.int64)
+        self.isbool=np.array(isbool, dtype=bool)
+        self.istrue=np.array([v is True for v in self.values], dtype=bool)
+        self.code_col=np.array(code_col, dtype=np.int64)
+        self.ncodes=len(self.values)
+        self.codes=codes
+        self.code_of={(attrs[code_col[g]],v):g for g,v in enumerate(self.values)}
+
+    def score(self, rows, hechos, asked, pool=None):
+        if not self.attrs or len(rows)==0: return []
+        k=len(rows); sub=self.codes[rows]
+        valid=sub>=0
+        g=(sub+self.offsets)[valid]
+        pos=np.broadcast_to(np.arange(k)[:,None], sub.shape)[valid]
+        cnt=np.bincount(g, minlength=self.ncodes)
+        first=np.full(self.ncodes, k, dtype=np.int64); np.minimum.at(first, g, pos)
+        n_attr=np.add.reduceat(cnt, self.offsets)
+        nonbool=np.add.reduceat(cnt*~self.isbool, self.offsets)
+        nc=n_attr[self.code_col]
+        p=cnt/np.maximum(nc,1)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            term=np.where(cnt>0, p*np.log2(np.where(cnt>0,p,1.0)), 0.0)
+        h=-np.add.reduceat(term, self.offsets)
+        # peor caso de cada pregunta categórica; desempate por primera aparición
+        big=np.iinfo(np.int64).max
+        key=np.where(cnt>0, np.maximum(cnt, nc-cnt)*(k+1)+first, big)
+        for t in asked:
+            if t[0]=='cat':
+                gi=self.code_of.get((t[1],t[2]))
+                if gi is not None: key[gi]=big
+        best=np.minimum.reduceat(key, self.offsets)
+        present=[a for a in self.attrs if n_attr[self.col[a]]>0]
+        scored=[]
+        for a in _question_attrs(present, hechos, pool):
+            c=self.col[a]
+            if nonbool[c]==0:
+                t=('bool',a)
+                if t in asked: continue
+                scored.append((float(h[c]),t))
+            elif best[c]<big:
+                lo=self.offsets[c]; hi=self.offsets[c+1] if c+1<len(self.attrs) else self.ncodes
+                gi=lo+int(np.argmin(key[lo:hi]))
+                scored.append((float(h[c]),('cat',a,self.values[gi])))
+        return scored
+
 def is_boolean_attr(cands, attr):
     vals=[c.get("atributos",{}).get(attr,None) for c in cands if attr in c.get("atributos",{})]
     return len(vals)>0 and set(type(v) for v in vals)=={bool}
@@ -141,17 +1275,71 @@ def entropy(counts):
     if n==0: return 0.0
     return -sum((c/n)*math.log2(c/n) for c in counts.values() if c>0)
 
-def _best_from_pool(cands, hechos, asked, pool):
-    attrs=[]
-    present=set(k for c in cands for k in c.get("atributos",{}).keys())
-    for a in pool:
-        if a in present and a not in hechos: attrs.append(a)
+def _question_attrs(present, hechos, pool=None):
+    # orden estable: el del pool (ya barajado) o alfabético si no hay pool
+    if pool is None: return sorted(a for a in present if a not in hechos)
+    return [a for a in pool if a in present and a not in hechos]
+
+class ScoreCache:
+    # LRU de preguntas puntuadas por estado: (índice, hash del conjunto de
+    # candidatos, preguntas ya hechas) -> {attr: (entropía, pregunta)}.
+    def __init__(self, capacity):
+        self.capacity=capacity; self.data=OrderedDict()
+        self.hits=self.misses=self.evictions=self.invalidations=0
+
+    def get(self, key):
+        v=self.data.get(key)
+        if v is None: self.misses+=1; return None
+        self.data.move_to_end(key); self.hits+=1
+        return v
+
+    def put(self, key, value):
+        self.data[key]=value; self.data.move_to_end(key)
+        while len(self.data)>self.capacity:
+            self.data.popitem(last=False); self.evictions+=1
+
+    def clear(self):
+        self.data.clear(); self.invalidations+=1
+
+    def stats(self):
+        return {"size":len(self.data), "hits":self.hits, "misses":self.misses,
+                "evictions":self.evictions, "invalidations":self.invalidations}
+
+SCORE_CACHE=ScoreCache(SCORE_CACHE_SIZE)
+
+def _score_questions(cands, hechos, asked, pool=None, index=None, mask=None):
+    if index is not None and mask is not None and SCORE_CACHE.capacity>0:
+        # se cachea la puntuación de todos los atributos y se filtra por
+        # hechos/pool al leer: el orden del pool barajado se respeta igual
+        key=(index.uid, index.digest(mask), frozenset(asked))
+        per_attr=SCORE_CACHE.get(key)
+        if per_attr is None:
+            per_attr={t[1]:(h,t) for h,t in _score_uncached(cands, {}, asked, None, index, mask)}
+            SCORE_CACHE.put(key, per_attr)
+        return [per_attr[a] for a in _question_attrs(per_attr.keys(), hechos, pool)]
+    return _score_uncached(cands, hechos, asked, pool, index, mask)
+
+def _score_uncached(cands, hechos, asked, pool=None, index=None, mask=None):
+    if index is not None and mask is not None and mask==index.all:
+        # raíz: los conteos del roster entero ya están en index.stats
+        present=index.stats.counts.keys()
+        counts=index.stats.counts.get
+    elif NUMPY_SCORER and index is not None and mask is not None and numpy_ok():
+        return index.matrix().score(index.rows(mask), hechos, asked, pool)
+    elif index is not None and mask is not None:
+        # conteo directo sobre las columnas de las filas vivas
+        rows=index.row_ids(mask); cols=index.cols
+        present={a for a,h in index.has.items() if h & mask}
+        counts=lambda a: cols.counts(rows, a)
+    else:
+        present=set(k for c in cands for k in c.get("atributos",{}).keys())
+        counts=lambda a: value_counts(cands, a)
     scored=[]
-    for a in attrs:
-        cnt=value_counts(cands,a)
+    for a in _question_attrs(present, hechos, pool):
+        cnt=counts(a)
         if not cnt: continue
         h=entropy(cnt)
-        if is_boolean_attr(cands,a):
+        if all(type(v) is bool for v in cnt):  # is_boolean_attr
             t=('bool',a)
             if t in asked: continue
             scored.append((h,t))
@@ -164,43 +1352,162 @@ def _best_from_pool(cands, hechos, asked, pool):
                 worst=max(c,n-c)
                 if worst<best_worst: best_t, best_worst=t, worst
             if best_t: scored.append((h,best_t))
+    return scored
+
+def _pick_scored(scored):
     if not scored: return None
-    scored.sort(key=lambda x: x[0], reverse=True)
+    if QUESTION_PRIORS is not None: scored=QUESTION_PRIORS.weigh(scored)
+    # redondeo: ambos backends suman en distinto orden y solo difieren en el último ulp
+    scored.sort(key=lambda x: round(x[0],12), reverse=True)
     return random.choice(scored[:TOPK_RANDOM])[1]
 
-def best_question_entropy(cands, hechos, asked):
-    attrs=set(k for c in cands for k in c.get("atributos",{}).keys())
-    attrs=[a for a in attrs if a not in hechos]
-    scored=[]
-    for a in attrs:
-        cnt=value_counts(cands,a)
-        if not cnt: continue
-        h=entropy(cnt)
-        if is_boolean_attr(cands,a):
-            t=('bool',a)
-            if t in asked: continue
-            scored.append((h,t))
+def _best_from_pool(cands, hechos, asked, pool, index=None, mask=None):
+    return _pick_scored(_score_questions(cands, hechos, asked, pool, index, mask))
+
+def best_question_entropy(cands, hechos, asked, index=None, mask=None):
+    return _pick_scored(_score_questions(cands, hechos, asked, None, index, mask))
+
+# ---------------- Planificador (dos pasos) ----------------
+# Coste de una pregunta = preguntas que aún faltarán en promedio:
+# 1 + Σ p(respuesta)·V(rama). Con "No sé" (objetivo sin el atributo) la rama
+# no cambia. A un paso V es log2(candidatos); a dos pasos V es el mejor coste
+# a un paso dentro de la rama. Se miran todos los valores de cada atributo,
+# no solo el de menor peor caso.
+def _leaf(k): return math.log2(k) if k>1 else 0.0
+
+def split_costs(index, mask, hechos, asked, pool=None):
+    # -> [(coste a un paso, pregunta)] de menor a mayor, empates en orden estable
+    k=mask.bit_count()
+    if k<=1: return []
+    attrs=None if pool is None else set(pool)
+    ok=lambda a: a not in hechos and (attrs is None or a in attrs)
+    out=[]
+    if numpy_ok():
+        m=index.matrix()
+        if not m.attrs: return []
+        rows=index.rows(mask); sub=m.codes[rows]; valid=sub>=0
+        cnt=np.bincount((sub+m.offsets)[valid], minlength=m.ncodes)
+        na=np.add.reduceat(cnt, m.offsets)[m.code_col]; miss=k-na; no=na-cnt
+        lf=lambda x: np.log2(np.maximum(x,1))
+        cost=np.round(1+(cnt*lf(cnt+miss)+no*lf(no+miss)+miss*_leaf(k))/k, 12)
+        # atributo booleano = sin valores no booleanos presentes; de él solo se pregunta "True"
+        isbool_col=np.add.reduceat(~m.isbool & (cnt>0), m.offsets)==0
+        keep=np.array([ok(a) for a in m.attrs], dtype=bool)[m.code_col] & (cnt>0) & ((no>0) | (miss>0))
+        keep&=~isbool_col[m.code_col] | m.istrue
+        for g in np.flatnonzero(keep)[np.argsort(cost[keep], kind="stable")]:
+            a=m.attrs[m.code_col[g]]
+            q=('bool',a) if isbool_col[m.code_col[g]] else ('cat',a,m.values[g])
+            if q not in asked: out.append((float(cost[g]), q))
+        return out
+    rows=index.row_ids(mask); cols=index.cols
+    for a in sorted(a for a,h in index.has.items() if h & mask and ok(a)):
+        cnt=cols.counts(rows, a); n=sum(cnt.values()); miss=k-n
+        boolean=all(type(v) is bool for v in cnt); code=cols.code[a]
+        for v,c in sorted(cnt.items(), key=lambda t: code[t[0]]):  # orden de código, como el camino NumPy
+            if boolean and v is not True: continue
+            if c==n and miss==0: continue
+            q=('bool',a) if boolean else ('cat',a,v)
+            if q in asked: continue
+            out.append((round(1+(c*_leaf(c+miss)+(n-c)*_leaf(n-c+miss)+miss*_leaf(k))/k, 12), q))
+    out.sort(key=lambda t: t[0])
+    return out
+
+def lookahead_cost(index, mask, hechos, asked, q, here):
+    # coste a dos pasos de q; here = mejor coste a un paso del estado actual
+    k=mask.bit_count(); f=fact_of(q, True); a=f[0]
+    n_miss=(mask & ~index.has.get(a,0)).bit_count()
+    total=n_miss*here
+    asked2=asked|{q}
+    for ans in (True, False):
+        sub=index.narrow(mask, q, ans); n=sub.bit_count()-n_miss
+        if n<=0: continue
+        h2=dict(hechos); h2[a]=f[1]
+        best=split_costs(index, sub, h2 if ans is True else hechos, asked2)
+        total+=n*(best[0][0] if best else _leaf(sub.bit_count()))
+    return 1+total/k
+
+_PLAN_INDEX=None
+_PLAN_GEN=None
+
+def _plan_init(datafile, gen=None):
+    # con fork el índice ya viene del padre; con spawn se carga el roster del archivo
+    global _PLAN_INDEX, _PLAN_GEN, DATAFILE
+    _PLAN_GEN=gen
+    if _PLAN_INDEX is None: DATAFILE=datafile; _PLAN_INDEX=Roster(*load_roster_columns()).index
+
+def _plan_task(task):
+    mask, hechos, asked, q, here, gen = task
+    if _PLAN_GEN is not None and _PLAN_GEN.value!=gen: return None  # jugada ya decidida
+    return lookahead_cost(_PLAN_INDEX, mask, hechos, asked, q, here)
+
+class LookaheadPlanner:
+    # Elige la pregunta de menor coste a dos pasos entre las LOOKAHEAD_WIDTH
+    # mejores a un paso. Las ramas se reparten en un Pool si hay procesos; lo
+    # que no termina dentro de LOOKAHEAD_BUDGET_MS se queda con su coste a un paso
+    # y su generación caduca: las tareas viejas aún en cola vuelven sin calcular
+    # en vez de retrasar las jugadas siguientes (una en curso acaba la suya).
+    # Con fork los procesos heredan el índice; con spawn cargan el de DATAFILE.
+    def __init__(self, index, processes=None, budget_ms=None, width=None):
+        self.index=index
+        self.processes=LOOKAHEAD_PROCESSES if processes is None else processes
+        self.budget_ms=LOOKAHEAD_BUDGET_MS if budget_ms is None else budget_ms
+        self.width=LOOKAHEAD_WIDTH if width is None else width
+        self._pool=None; self._gen=None; self.timeouts=0
+
+    def pool(self):
+        if self._pool is None and self.processes>1:
+            global _PLAN_INDEX
+            import multiprocessing
+            _PLAN_INDEX=self.index; self._gen=multiprocessing.Value("q", 0)
+            self._pool=multiprocessing.Pool(self.processes, initializer=_plan_init, initargs=(DATAFILE, self._gen))
+        return self._pool
+
+    def choose(self, mask, hechos, asked):
+        first=split_costs(self.index, mask, hechos, asked)
+        if not first: return None
+        here=first[0][0]; top=first[:self.width]
+        deadline=time.perf_counter()+self.budget_ms/1000
+        pool=self.pool(); costs=[c for c,_ in top]
+        if pool is not None:
+            from multiprocessing import TimeoutError as PoolTimeout
+            gen=self._gen.value
+            jobs=[pool.apply_async(_plan_task, ((mask, hechos, asked, q, here, gen),)) for _,q in top]
+            late=0
+            for i,job in enumerate(jobs):
+                try: costs[i]=job.get(max(0.0, deadline-time.perf_counter()))
+                except PoolTimeout: late+=1
+            if late:
+                self.timeouts+=late
+                with self._gen.get_lock(): self._gen.value+=1
         else:
-            n=sum(cnt.values())
-            best_t, best_worst=None, math.inf
-            for v,c in cnt.items():
-                t=('cat',a,v)
-                if t in asked: continue
-                worst=max(c,n-c)
-                if worst<best_worst: best_t, best_worst=t, worst
-            if best_t: scored.append((h,best_t))
-    if not scored: return None
-    scored.sort(key=lambda x: x[0], reverse=True)
-    return random.choice(scored[:TOPK_RANDOM])[1]
+            for i,(_,q) in enumerate(top):
+                if i and time.perf_counter()>deadline: self.timeouts+=len(top)-i; break
+                costs[i]=lookahead_cost(self.index, mask, hechos, asked, q, here)
+        j=min(range(len(top)), key=lambda i: (round(costs[i],12), i))
+        return top[j][1]
+
+    def close(self):
+        # las sesiones que aún usen este planificador siguen en el proceso
+        pool, self._pool = self._pool, None; self.processes=0
+        if pool is not None: pool.terminate()
 
 def score_candidate(p, hechos):
     attrs=p.get("atributos",{})
     return sum(1 for k,v in hechos.items() if attrs.get(k,object())==v)
 
-def top_two(cands, hechos):
-    scores=[(c,score_candidate(c,hechos)) for c in cands]
-    scores.sort(key=lambda x: x[1], reverse=True)
-    return [c for c,_ in scores[:2]]
+def _view_rows(cands):
+    # (columnas, filas) si cands son filas de un RosterColumns
+    if type(cands) is PlayerRows and cands.rows: return cands.cols, cands.rows
+    return None, None
+
+def top_two(cands, hechos, index=None, mask=None, levels=None):
+    if levels is not None: return [index.cols[r] for r,_ in index.top_rows(levels, mask, 2)]
+    cols, rows = _view_rows(cands)
+    if cols is not None:
+        sc=cols.match_scores(rows, hechos)
+        return [cands[j] for j in heapq.nlargest(2, range(len(sc)), key=sc.__getitem__)]
+    # nlargest es estable como el sort: en empate gana el primero
+    return heapq.nlargest(2, cands, key=lambda c: score_candidate(c,hechos))
 
 def discriminating_question(c1,c2,hechos,asked):
     prefer=["posicion","nacionalidad","liga","club","balon_oro","gano_mundial","gano_champions","usa_10","zurdo","juega_en_europa","leyenda_club"]
@@ -214,14 +1521,22 @@ def discriminating_question(c1,c2,hechos,asked):
         if t not in asked: return t
     return None
 
-def candidate_probability(cands, hechos):
+def candidate_probability(cands, hechos, index=None, mask=None, levels=None):
+    if levels is not None:
+        top=index.top_rows(levels, mask, 1)
+        if not top: return (None,0.0,0)
+        r,s=top[0]
+        return index.cols[r], (s+1)/(index.score_sum(levels, mask)+mask.bit_count()), s
     if not cands: return (None,0.0,0)
-    scores=[(c,score_candidate(c,hechos)) for c in cands]
-    scores.sort(key=lambda x:x[1], reverse=True)
-    s_sum=sum(s+1 for _,s in scores)
-    best_c, best_s = scores[0]
-    prob=(best_s+1)/s_sum if s_sum>0 else 0.0
-    return best_c, prob, best_s
+    cols, rows = _view_rows(cands)
+    if cols is not None:
+        sc=cols.match_scores(rows, hechos)
+        j=max(range(len(sc)), key=sc.__getitem__)  # primero de los empatados, como el sort estable
+        return cands[j], (sc[j]+1)/(sum(sc)+len(sc)), sc[j]
+    scores=[score_candidate(c,hechos) for c in cands]
+    j=max(range(len(scores)), key=scores.__getitem__)
+    s_sum=sum(scores)+len(scores)
+    return cands[j], (scores[j]+1)/s_sum if s_sum>0 else 0.0, scores[j]
 
 def pretty_attr(a): return PRETTY.get(a,a)
 
@@ -245,20 +1560,120 @@ def slugify(text):
     t=''.join(ch for ch in t if ch.isalnum() or ch in (' ','_','-')).strip()
     return t.lower().replace(' ','_')
 
-def find_character_image(name):
-    base=os.path.join(IMAGES_DIR,name)
-    slug=os.path.join(IMAGES_DIR,slugify(name))
-    for e in (".png",".gif",".jpg",".jpeg"):
-        if os.path.exists(base+e): return base+e
-        if os.path.exists(slug+e): return slug+e
-    return None
+_SLUG_DROP=re.compile(r"[^\w \-\n]")
+
+def _slugify_many(names):
+    # slugify de un millón de nombres: normalizar y filtrar el texto entero de
+    # una vez es un orden de magnitud más rápido que nombre a nombre
+    names=list(names)
+    t=unicodedata.normalize('NFD', "\n".join(names))
+    t=_SLUG_DROP.sub('', t.translate({ord(c):None for c in set(t) if unicodedata.category(c)=='Mn'}))
+    out=[x.strip().lower().replace(' ','_') for x in t.split("\n")]
+    return out if len(out)==len(names) else [slugify(x) for x in names]  # algún nombre traía saltos de línea
+
+# ---------------- Imágenes ----------------
+IMAGE_EXTS=(".png",".gif",".jpg",".jpeg")
+
+class ImageStore:
+    # Índice de IMAGES_DIR (se reescanea solo si cambia el mtime del
+    # directorio), miniaturas en disco por (origen, mtime, tamaño destino) y
+    # LRU en memoria de miniaturas PIL. La decodificación corre en un pool de
+    # hilos; los resultados vuelven al hilo de Tk por la cola `done`.
+    def __init__(self, images_dir, thumbs_dir, capacity=64, workers=2):
+        self.images_dir=images_dir; self.thumbs_dir=thumbs_dir
+        self.capacity=capacity; self.workers=workers
+        self.files={}; self.exact=set(); self.dir_stat=None
+        self.lru=OrderedDict(); self.lock=threading.Lock()
+        self.pool=None; self.done=queue.Queue(); self.pending=set()
+
+    def _refresh(self):
+        try: st=os.stat(self.images_dir).st_mtime_ns
+        except OSError: st=None
+        if st==self.dir_stat: return
+        self.dir_stat=st
+        try: names=sorted(os.listdir(self.images_dir))
+        except OSError: names=[]
+        # sin distinguir mayúsculas, extensión incluida (Messi.PNG); entre
+        # variantes del mismo nombre gana la primera en orden, la exacta antes
+        self.files={}
+        for n in names: self.files.setdefault(n.casefold(), os.path.join(self.images_dir,n))
+        self.exact=set(names)
+
+    def find(self, name):
+        self._refresh()
+        stems=(name, slugify(name))
+        for e in IMAGE_EXTS:
+            for stem in stems:
+                if stem+e in self.exact: return os.path.join(self.images_dir, stem+e)
+                p=self.files.get((stem+e).casefold())
+                if p is not None: return p
+        return None
+
+    def _thumb_path(self, path, st, size):
+        key=f"{os.path.abspath(path)}|{st.st_mtime_ns}|{st.st_size}|{size[0]}x{size[1]}"
+        return os.path.join(self.thumbs_dir, hashlib.sha1(key.encode("utf-8")).hexdigest()+".png")
+
+    def thumbnail(self, path, size):
+        # miniatura PIL (ya decodificada); segura desde cualquier hilo
+        if not pil_ok(): raise RuntimeError("PIL no disponible")
+        st=os.stat(path); key=(path, st.st_mtime_ns, size)
+        with self.lock:
+            im=self.lru.get(key)
+            if im is not None: self.lru.move_to_end(key); return im
+        tpath=self._thumb_path(path, st, size)
+        try:
+            im=Image.open(tpath); im.load()
+        except Exception:
+            im=Image.open(path); im.thumbnail(size, Image.LANCZOS)
+            try:
+                os.makedirs(self.thumbs_dir, exist_ok=True)
+                tmp=tpath+f".{os.getpid()}.{threading.get_ident()}.tmp"
+                im.save(tmp, "PNG"); os.replace(tmp, tpath)
+            except Exception:
+                pass
+        with self.lock:
+            self.lru[key]=im; self.lru.move_to_end(key)
+            while len(self.lru)>self.capacity: self.lru.popitem(last=False)
+        return im
+
+    def cached(self, path, size):
+        try: st=os.stat(path)
+        except OSError: return False
+        with self.lock: return (path, st.st_mtime_ns, size) in self.lru
+
+    def request(self, path, size, callback):
+        # decodifica en segundo plano; callback(im|None) se llama desde drain()
+        with self.lock:
+            if self.pool is None: self.pool=ThreadPoolExecutor(self.workers, thread_name_prefix="img")
+        def job():
+            try: im=self.thumbnail(path, size)
+            except Exception: im=None
+            with self.lock: self.pending.discard((path, size))
+            self.done.put((callback, im))
+        with self.lock: self.pending.add((path, size))
+        self.pool.submit(job)
+
+    def prefetch(self, path, size):
+        # deja la miniatura en el LRU sin esperar a que se pida la revelación
+        with self.lock:
+            if (path, size) in self.pending: return
+        if not self.cached(path, size): self.request(path, size, None)
+
+    def drain(self):
+        while True:
+            try: cb, im = self.done.get_nowait()
+            except queue.Empty: return
+            if cb is not None: cb(im)
+
+IMAGES=ImageStore(IMAGES_DIR, THUMBS_DIR, IMAGE_LRU_SIZE, IMAGE_WORKERS)
+
+def find_character_image(name): return IMAGES.find(name)
 
 def load_image_for_ui(path,max_w=360,max_h=360):
     if path is None: return None
     try:
-        if PIL_OK:
-            im=Image.open(path); im.thumbnail((max_w,max_h), Image.LANCZOS)
-            return ImageTk.PhotoImage(im)
+        if pil_ok():
+            return ImageTk.PhotoImage(IMAGES.thumbnail(path, (max_w,max_h)))
         img=tk.PhotoImage(file=path)
         w,h=img.width(),img.height()
         fx=max(1,int(w/max_w)) if w>max_w else 1
@@ -268,13 +1683,634 @@ def load_image_for_ui(path,max_w=360,max_h=360):
     except Exception:
         return None
 
+# ---------------- Motor bayesiano ----------------
+def _hbin(x):
+    x=np.clip(x, 1e-12, 1-1e-12)
+    return -(x*np.log2(x)+(1-x)*np.log2(1-x))
+
+class BayesEngine:
+    # Log-probabilidad sobre todo el roster en lugar de descartar candidatos:
+    # una respuesta equivocada baja la probabilidad del jugador correcto pero
+    # no lo elimina. "No sé" no cambia nada; si el jugador no tiene el
+    # atributo, sí/no pesan 0.5. Se comparte (solo lectura) entre sesiones.
+    def __init__(self, index, error_rate=None):
+        if not numpy_ok(): raise RuntimeError("El modo bayesiano necesita numpy.")
+        self.m=m=index.matrix(); self.n=len(index.personajes)
+        self.error_rate=e=BAYES_ERROR_RATE if error_rate is None else error_rate
+        self.l_hit, self.l_miss, self.l_none = math.log(1-e), math.log(e), math.log(0.5)
+        valid=m.codes>=0
+        self.flat_code=(m.codes+m.offsets)[valid]
+        self.flat_row=np.broadcast_to(np.arange(self.n)[:,None], m.codes.shape)[valid]
+        qg, self.questions = [], []
+        for g,v in enumerate(m.values):
+            a=m.attrs[m.code_col[g]]
+            if m.isbool[g]:
+                if v is True: qg.append(g); self.questions.append(('bool',a))
+            else: qg.append(g); self.questions.append(('cat',a,v))
+        self.q_code=np.array(qg, dtype=np.int64)
+        self.q_col=m.code_col[self.q_code] if qg else np.zeros(0, dtype=np.int64)
+        self.q_pos={q:i for i,q in enumerate(self.questions)}
+
+    def prior(self): return np.zeros(self.n)
+
+    def posterior(self, logp):
+        p=np.exp(logp-logp.max()); return p/p.sum()
+
+    def update(self, logp, q, ans):
+        # devuelve un vector nuevo: las instantáneas de deshacer guardan el anterior
+        if ans is None: return logp
+        a=q[1]; v=True if q[0]=='bool' else q[2]
+        col=self.m.col.get(a)
+        if col is None: return logp
+        column=self.m.codes[:,col]
+        g=self.m.code_of.get((a,v))
+        hit=(column+self.m.offsets[col]==g) if g is not None else np.zeros(self.n, dtype=bool)
+        yes, no = (self.l_hit, self.l_miss) if ans else (self.l_miss, self.l_hit)
+        return logp+np.where(column<0, self.l_none, np.where(hit, yes, no))
+
+    def info_gain(self, post):
+        e=self.error_rate
+        w_code=np.bincount(self.flat_code, weights=post[self.flat_row], minlength=self.m.ncodes)
+        w_col=np.add.reduceat(w_code, self.m.offsets)
+        wm=w_code[self.q_code]; wp=w_col[self.q_col]; wmiss=np.clip(1.0-wp, 0.0, 1.0)
+        p_yes=wm*(1-e)+(wp-wm)*e+wmiss*0.5
+        return _hbin(p_yes)-(wp*_hbin(np.array(e))+wmiss)
+
+    def best_question(self, post, asked):
+        if not self.questions: return None
+        ig=self.info_gain(post)
+        if QUESTION_PRIORS is not None: ig=ig*QUESTION_PRIORS.vector(self.questions)
+        for q in asked:
+            i=self.q_pos.get(q)
+            if i is not None: ig[i]=-np.inf
+        i=int(np.argmax(ig))
+        return self.questions[i] if ig[i]>1e-9 else None
+
+# ---------------- Sesión de juego (sin Tk) ----------------
+class Roster:
+    # Datos de solo lectura compartidos por todas las sesiones de un proceso.
+    def __init__(self, personajes, catalog):
+        self.cols=personajes if isinstance(personajes, RosterColumns) else RosterColumns(personajes)
+        self.personajes=self.cols; self.catalog=dict(catalog)
+        self.index=RosterIndex(self.cols)
+        self.dominios=self.index.stats.domains()
+        self.book=None; self._bayes=None; self._planner=None
+
+    def bayes(self):
+        if self._bayes is None: self._bayes=BayesEngine(self.index)
+        return self._bayes
+
+    def names(self): return self.cols.names()
+    def names_ready(self): return self.cols._names is not None
+
+    def note_added(self, attrs):
+        # alta hecha desde este proceso: dominios del formulario al día sin
+        # releer el dataset. index.stats no se toca (puntúa la raíz de estas
+        # columnas); el próximo Roster.current() los trae con el jugador.
+        for a,v in attrs.items():
+            dom=self.dominios.setdefault(a, [])
+            if v not in dom: bisect.insort(dom, v, key=str)
+
+    def planner(self):
+        if self._planner is None: self._planner=LookaheadPlanner(self.index)
+        return self._planner
+
+    def close(self):
+        # procesos del planificador; el resto es memoria que libera el GC
+        if self._planner is not None: self._planner.close()
+
+    @classmethod
+    def load(cls, profile=None):
+        # profile: StartupProfile que anota cada fase por separado
+        t=time.perf_counter(); cols, catalog = load_roster_columns()
+        if profile: profile.add("dataset load", t); t=time.perf_counter()
+        r=cls(cols, catalog)
+        if profile: profile.add("index + domains", t); t=time.perf_counter()
+        r.book=load_opening_book(r)
+        if profile: profile.add("opening book", t)
+        return r
+
+    _current=None; _lock=threading.Lock()
+
+    @classmethod
+    def current(cls, profile=None):
+        # el mismo roster (índice incluido) mientras el dataset no cambie;
+        # basta con stat: el JSON solo se lee si hay que recompilar el binario
+        with cls._lock:
+            st=_store(); key=(st.path, st._file_stat(), st.gen)
+            r=cls._current
+            if r is None or r.gen!=key:
+                old=r; r=cls.load(profile); r.gen=(st.path, st._file_stat(), st.gen); cls._current=r
+                if old is not None: old.close()
+            return r
+
+# ---------------- Libro de aperturas ----------------
+# Las primeras QUESTION_MIN_REVEAL preguntas solo dependen del prefijo de
+# respuestas, así que akinator_book.py las precalcula: prefijo -> top-K
+# preguntas. Se descarta si cambia el dataset o los parámetros.
+# Guarda BOOK_TOPK preguntas con su puntuación sin priors y la de la
+# siguiente (floor): los priors se aplican al consultar y no entran en el hash.
+def book_key(history):
+    return json.dumps([[list(q),ans] for q,ans in history], ensure_ascii=False, separators=(",",":"))
+
+def dataset_hash(personajes, catalog):
+    if isinstance(personajes, RosterColumns): digest=personajes.digest()  # viene precalculado en el binario
+    else: digest=players_digest(p.to_dict() if isinstance(p, PlayerView) else p for p in personajes)
+    params=[PHASE_BASIC_Q, PHASE_PHYS_Q, QUESTION_MIN_REVEAL, TOPK_RANDOM, GameSession.BASIC_SET, GameSession.PHYS_SET, CORE_ATTRS]
+    blob=json.dumps({"personajes":digest, "catalog":catalog, "params":params}, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha1(blob.encode("utf-8")).hexdigest()
+
+def load_opening_book(roster, path=None):
+    path=path or OPENING_BOOK
+    if not os.path.exists(path): return None
+    try:
+        with open(path, "r", encoding="utf-8") as f: raw=json.load(f)
+    except Exception:
+        return None
+    if raw.get("dataset_hash")!=dataset_hash(roster.personajes, roster.catalog): return None
+    return {k:([tuple(q) for q in e["top"]], e.get("score"), e.get("floor"))
+            for k,e in raw.get("entries",{}).items()}
+
+def book_top(e):
+    # preguntas del libro entre las que elegir; None si con priors activos el
+    # libro no basta (libro antiguo sin puntuaciones, o una pregunta de fuera
+    # podría ganar: los pesos son <=1, así que fuera nada supera floor)
+    top, score, floor = e
+    if QUESTION_PRIORS is None: return top[:TOPK_RANDOM]
+    if score is None: return None
+    scored=QUESTION_PRIORS.weigh(list(zip(score, top)))
+    scored.sort(key=lambda x: round(x[0],12), reverse=True); scored=scored[:TOPK_RANDOM]
+    if floor is not None and scored and round(scored[-1][0],12)<round(floor,12): return None
+    return [t for _,t in scored]
+
+# ---------------- Telemetría ----------------
+# Con TELEMETRY activo (--telemetry ruta.jsonl o AKINATOR_TELEMETRY=ruta)
+# cada paso del motor deja una línea JSON: evento, respuesta, candidatos
+# antes/después, rama elegida, ms por etapa y aciertos de cachés. Apagado,
+# las sesiones usan _NO_TRACE y cada etapa cuesta una llamada vacía.
+class _NullTrace:
+    __slots__=()
+    def lap(self, stage): pass
+    def took(self, branch): pass
+
+_NO_TRACE=_NullTrace()
+
+class StepTrace:
+    __slots__=("rec","t0","last","stages","base")
+    def __init__(self, rec, base):
+        self.rec=rec; self.base=base; self.stages={}; self.t0=self.last=time.perf_counter()
+
+    def lap(self, stage):
+        t=time.perf_counter(); self.stages[stage]=self.stages.get(stage,0.0)+t-self.last; self.last=t
+
+    def took(self, branch): self.rec["branch"]=branch
+
+def _dist_ms(xs):
+    xs=sorted(xs); n=len(xs)
+    if not n: return {"count":0}
+    at=lambda p: xs[min(n-1, int(p/100*n))]
+    return {"count":n, "mean":round(sum(xs)/n,4), "p50":round(at(50),4), "p90":round(at(90),4),
+            "max":round(xs[-1],4), "total":round(sum(xs),3)}
+
+class Telemetry:
+    def __init__(self, path=None):
+        self.path=path; self.out=open(path, "a", encoding="utf-8") if path else None
+        self.lock=threading.Lock(); self._sids=itertools.count(1)
+        self.steps=0; self.branches=Counter(); self.stage_ms={}; self.step_ms=[]
+        self.narrow=[]; self.cache=Counter()
+
+    def session_id(self): return next(self._sids)
+
+    def begin(self, session, event, ans=None):
+        ix=session.index
+        rec={"session":session.tid, "event":event, "q":session.q_count,
+             "cands_before":session.cand_mask.bit_count() if session.bayes is None else None,
+             "branch":None}
+        if event=="answer": rec["answer"]=ans
+        return StepTrace(rec, (SCORE_CACHE.hits, SCORE_CACHE.misses, ix.hits, ix.misses))
+
+    def end(self, tr, session):
+        rec=tr.rec; t=time.perf_counter(); ix=session.index
+        sh, sm, bh, bm = tr.base
+        rec["cands_after"]=session.cand_mask.bit_count() if session.bayes is None else None
+        step=session.step or {}
+        rec["step"]=step.get("type"); rec["question"]=step.get("q"); rec["nombre"]=step.get("nombre")
+        rec["stages_ms"]={k:round(v*1000,4) for k,v in tr.stages.items()}
+        rec["total_ms"]=round((t-tr.t0)*1000,4)
+        rec["cache"]={"score_hits":SCORE_CACHE.hits-sh, "score_misses":SCORE_CACHE.misses-sm,
+                      "bitset_hits":ix.hits-bh, "bitset_misses":ix.misses-bm}
+        with self.lock:
+            self.steps+=1; self.branches[rec["branch"]]+=1; self.step_ms.append(rec["total_ms"])
+            for k,v in rec["stages_ms"].items(): self.stage_ms.setdefault(k,[]).append(v)
+            self.cache.update(rec["cache"])
+            if rec["event"]=="answer" and rec["cands_before"]: self.narrow.append(rec["cands_after"]/rec["cands_before"])
+            if self.out is not None: self.out.write(json.dumps(rec, ensure_ascii=False)+"\n")
+
+    def summary(self):
+        with self.lock:
+            c=self.cache
+            rate=lambda h,m: round(h/(h+m),4) if h+m else None
+            return {"steps":self.steps, "branches":dict(self.branches.most_common()),
+                    "step_ms":_dist_ms(self.step_ms),
+                    "stages_ms":{k:_dist_ms(v) for k,v in sorted(self.stage_ms.items())},
+                    "score_cache_hit_rate":rate(c["score_hits"], c["score_misses"]),
+                    "bitset_cache_hit_rate":rate(c["bitset_hits"], c["bitset_misses"]),
+                    "cands_kept_mean":round(sum(self.narrow)/len(self.narrow),4) if self.narrow else None}
+
+    def close(self):
+        if self.out is not None: self.out.close(); self.out=None
+
+TELEMETRY=None
+
+def enable_telemetry(path=None):
+    # las sesiones creadas a partir de ahora registran sus pasos
+    global TELEMETRY
+    if TELEMETRY is not None: TELEMETRY.close()
+    TELEMETRY=Telemetry(path)
+    return TELEMETRY
+
+# ---------------- Partidas jugadas ----------------
+# Cada partida terminada deja una línea en OUTCOME_LOG: camino de preguntas y
+# respuestas, jugador propuesto, cómo acabó y el jugador real si se sabe.
+# QuestionPriors agrega el log (leyendo solo la cola nueva) y pondera las
+# preguntas en _pick_scored y en el motor bayesiano.
+def expected_answer(attrs, q):
+    # respuesta correcta a q para un jugador; None si no tiene el dato
+    if q[1] not in attrs: return None
+    if q[0]=="bool": return attrs[q[1]] is True
+    return attrs[q[1]]==q[2]
+
+def _h2(e): return -(e*math.log2(e)+(1-e)*math.log2(1-e)) if 0<e<1 else 0.0
+
+def iter_outcomes(path, pos=0): return _iter_jsonl(path, pos)
+
+class QuestionPriors:
+    # Por pregunta: [preguntada, sí, no, no sé, juzgadas, erróneas]; una
+    # respuesta se juzga si la partida tiene jugador final con ese dato.
+    # weight(q)=(1-P(no sé))·(1-H(P(error))): la fracción de la entropía de q
+    # que de verdad llega. Las tasas se suavizan hacia las de su atributo y
+    # las globales con PRIOR_STRENGTH respuestas ficticias; sin datos todas
+    # las preguntas pesan lo mismo y el orden no cambia.
+    def __init__(self, lookup=None, strength=None):
+        self.lookup=lookup  # nombre -> atributos del jugador (o None)
+        self.strength=PRIOR_STRENGTH if strength is None else strength
+        self.q={}; self.by_attr={}; self.tot=[0]*6
+        self.games=0; self.outcomes=Counter(); self.path=None; self.pos=0
+        self._w={}; self._vec=None
+
+    def add(self, rec, attrs=None):
+        self.games+=1; self.outcomes[rec.get("outcome")]+=1
+        for q,ans in rec.get("path", ()):
+            q=tuple(q); i=1 if ans is True else 2 if ans is False else 3
+            exp=expected_answer(attrs, q) if attrs is not None and ans is not None else None
+            for c in (self.q.setdefault(q, [0]*6), self.by_attr.setdefault(q[1], [0]*6), self.tot):
+                c[0]+=1; c[i]+=1
+                if exp is not None: c[4]+=1; c[5]+=exp is not ans
+        self._w.clear(); self._vec=None
+
+    def refresh(self, path=None, lookup=None):
+        # incorpora las partidas añadidas al log desde la última lectura;
+        # lookup (si se da) resuelve los jugadores finales de esta pasada
+        path=path or self.path; lookup=lookup or self.lookup
+        if path!=self.path: self.path=path; self.pos=0
+        n=0
+        for rec,pos in iter_outcomes(path, self.pos):
+            final=rec.get("final")
+            self.add(rec, lookup(final) if final and lookup else None); self.pos=pos; n+=1
+        return n
+
+    def rates(self, q):
+        # -> (P(no sé), P(error)) suavizadas: pregunta -> atributo -> global
+        s=self.strength; t=self.tot
+        unk=t[3]/t[0] if t[0] else 0.0; err=t[5]/t[4] if t[4] else 0.0
+        for c in (self.by_attr.get(q[1]), self.q.get(q)):
+            if c is not None and s>0:
+                unk=(c[3]+s*unk)/(c[0]+s); err=(c[5]+s*err)/(c[4]+s)
+        return unk, min(err, 0.5)
+
+    def weight(self, q):
+        w=self._w.get(q)
+        if w is None:
+            unk,err=self.rates(q); w=self._w[q]=(1.0-unk)*(1.0-_h2(err))
+        return w
+
+    def weigh(self, scored): return [(h*self.weight(t), t) for h,t in scored]
+
+    def vector(self, questions):
+        # pesos de una lista fija de preguntas (la del motor bayesiano), cacheados
+        if self._vec is None or self._vec[0] is not questions:
+            self._vec=(questions, np.array([self.weight(q) for q in questions]))
+        return self._vec[1]
+
+    def summary(self, top=10):
+        # -> dict con totales y las preguntas más penalizadas
+        worst=sorted(self.q, key=lambda q: (self.weight(q), q))[:top]
+        row=lambda q: {"q":list(q), "asked":self.q[q][0], "unknown":round(self.rates(q)[0],4),
+                       "error":round(self.rates(q)[1],4), "weight":round(self.weight(q),4)}
+        return {"games":self.games, "outcomes":dict(self.outcomes), "answers":self.tot[0],
+                "unknown_rate":round(self.tot[3]/self.tot[0],4) if self.tot[0] else None,
+                "error_rate":round(self.tot[5]/self.tot[4],4) if self.tot[4] else None,
+                "questions":len(self.q), "most_penalized":[row(q) for q in worst]}
+
+class OutcomeLog:
+    def __init__(self, path):
+        self.path=path; self.lock=FileLock(os.path.splitext(path)[0]+LOCK_SUFFIX)
+
+    def append(self, rec):
+        with self.lock: _append_lines(self.path, [json.dumps(rec, ensure_ascii=False)])
+
+QUESTION_PRIORS=None
+_OUTCOMES=None
+
+def roster_lookup(roster, extra=None):
+    # nombre -> atributos contra un roster fijo (todos los nombres de una
+    # pasada contra el mismo); extra: {nombre: atributos} aún fuera del roster
+    names=roster.names()
+    def attrs(name):
+        if extra and name in extra: return extra[name]
+        i=names.find(name)
+        return roster.personajes[i]["atributos"] if i is not None else None
+    return attrs
+
+def load_priors(path=None, lookup=None, roster=None):
+    # priors del log completo para las sesiones de este proceso (None si no hay
+    # log); roster: el que ya tiene el llamador, si no Roster.current() una vez
+    global QUESTION_PRIORS
+    path=path or OUTCOME_LOG
+    if not os.path.exists(path): return None
+    pr=QuestionPriors(lookup or roster_lookup(roster or Roster.current())); pr.refresh(path)
+    QUESTION_PRIORS=pr
+    return pr
+
+def log_outcome(rec, roster=None, final_attrs=None):
+    # roster/final_attrs: con qué resolver el jugador final al incorporar la
+    # partida a los priors sin recargar el roster (final_attrs: alta recién hecha)
+    global _OUTCOMES
+    if _OUTCOMES is None or _OUTCOMES.path!=OUTCOME_LOG: _OUTCOMES=OutcomeLog(OUTCOME_LOG)
+    _OUTCOMES.append(rec)
+    if QUESTION_PRIORS is not None and QUESTION_PRIORS.path==OUTCOME_LOG:
+        extra={rec.get("final"):final_attrs} if final_attrs is not None else None
+        QUESTION_PRIORS.refresh(lookup=roster_lookup(roster, extra) if roster is not None else None)
+
+class GameSession:
+    # Estado de una partida. next_question/answer/undo devuelven el paso a
+    # mostrar: {"type":"question","q","text"}, {"type":"result","nombre",
+    # "certain"} o {"type":"empty"} (sin coincidencias: ofrecer alta).
+    BASIC_SET=["posicion","nacionalidad"]; PHYS_SET=["liga"]
+
+    def __init__(self, roster, mode=None):
+        self.roster=roster; self.index=roster.index; self.catalog=roster.catalog
+        self.mode=mode or ENGINE_MODE
+        self.bayes=roster.bayes() if self.mode=="bayes" else None
+        self.planner=roster.planner() if LOOKAHEAD and self.bayes is None else None
+        self.logp=self.bayes.prior() if self.bayes is not None else None
+        self.hechos, self.negaciones = {}, set()
+        self.asked_pairs=set(); self.first_attrs=set()
+        self.cand_mask=self.index.all; self.levels=(self.index.all,); self._cands=None
+        self.qtuple=None; self.q_count=0
+        self.history=(); self.pending_confirm=None
+        self.step=None; self.likely=[]
+        self.undo_stack=[]; self.redo_stack=[]
+        self.tm=TELEMETRY; self.tid=self.tm.session_id() if self.tm is not None else None
+
+    def _trace(self, event, ans=None):
+        return _NO_TRACE if self.tm is None else self.tm.begin(self, event, ans)
+
+    def _traced(self, tr):
+        if tr is not _NO_TRACE: self.tm.end(tr, self)
+        return self.step
+
+    def _question(self, q, txt=None):
+        self.qtuple=q; self.step={"type":"question", "q":q, "text":txt if txt else question_text(q, self.catalog)}
+        return self.step
+
+    def _result(self, nombre, certain):
+        self.qtuple=None; self.step={"type":"result", "nombre":nombre, "certain":certain}
+        return self.step
+
+    def _empty(self):
+        self.qtuple=None; self.pending_confirm=None; self.step={"type":"empty"}
+        return self.step
+
+    def result(self):
+        return self.step if self.step is not None and self.step["type"]=="result" else None
+
+    def outcome_record(self, outcome, final=None):
+        # línea para OUTCOME_LOG; outcome: "win", "wrong", "added", "empty" o "abandoned"
+        res=self.result()
+        return {"t":round(time.time(),3), "mode":self.mode, "outcome":outcome,
+                "guess":res["nombre"] if res else None, "final":final, "questions":self.q_count,
+                "path":[[list(q),ans] for q,ans in self.history]}
+
+    def phase_pools(self, deterministic=False):
+        pools=[]
+        if self.q_count < PHASE_BASIC_Q:
+            pools.append([a for a in self.BASIC_SET if a not in self.first_attrs])
+        if self.q_count < PHASE_BASIC_Q + PHASE_PHYS_Q:
+            pools.append([a for a in self.PHYS_SET if a not in self.first_attrs])
+        rest=set(CORE_ATTRS)-set(self.BASIC_SET)-set(self.PHYS_SET)
+        rest=sorted(rest) if deterministic else list(rest)
+        pools.append([a for a in list(self.catalog.keys()) + rest if a not in self.first_attrs])
+        return pools
+
+    def phase_ranked(self):
+        # preguntas de la primera fase que tenga alguna, ordenadas y sin priors
+        # (de aquí sale el libro)
+        for pool in self.phase_pools(deterministic=True):
+            scored=_score_questions(self.candidatos, self.hechos, self.asked_pairs, pool, self.index, self.cand_mask)
+            if scored:
+                scored.sort(key=lambda x: round(x[0],12), reverse=True)
+                return scored
+        return []
+
+    def pick_question_phased(self, cands, tr=_NO_TRACE):
+        if self.roster.book is not None:
+            e=self.roster.book.get(book_key(self.history))
+            top=book_top(e) if e is not None else None
+            if top is not None: tr.took("book"); return random.choice(top) if top else None
+        tr.took("phased"); q=None
+        for pool in self.phase_pools():
+            random.shuffle(pool); q=_best_from_pool(cands, self.hechos, self.asked_pairs, pool, self.index, self.cand_mask)
+            if q: return q
+        return q
+
+    def pick_special_from_data(self, name):
+        i=self.roster.names().find(name)
+        if i is not None:
+            for rule in self.roster.personajes[i].get("confirm", []):
+                a, expected = rule["attr"], rule["value"]
+                if (a in self.hechos and self.hechos[a]==expected) or ((a,expected) in self.negaciones): continue
+                q=('bool',a) if isinstance(expected,bool) else ('cat',a,expected)
+                return q, expected, rule.get("question")
+        return None, None, None
+
+    def next_question(self):
+        tr=self._trace("next"); self._next(tr)
+        return self._traced(tr)
+
+    def _next(self, tr):
+        self.likely=[]  # nombres que probablemente se revelen pronto (precarga de fotos)
+        if self.bayes is not None: return self._next_bayes(tr)
+        cands=self.candidatos; tr.lap("members")
+        if not cands: tr.took("empty"); return self._empty()
+        if len(self.candidatos)<=PREFETCH_CANDIDATES: self.likely=[c["nombre"] for c in self.candidatos]
+
+        if self.q_count < QUESTION_MIN_REVEAL:
+            q=self.pick_question_phased(self.candidatos, tr); tr.lap("phased")
+            if q is None: q=('bool','gano_mundial'); tr.took("default")
+            self._ask(q); self.first_attrs=self.first_attrs|{q[1]}
+            return self._question(q)
+
+        if len(self.candidatos)==1:
+            tr.took("single"); return self._result(self.candidatos[0]["nombre"], True)
+
+        if self.pending_confirm is not None:
+            tr.took("pending_confirm")
+            _, q, _, txt = self.pending_confirm
+            return self._question(q, txt)
+
+        # con planificador, top_two/discriminating solo para decidir entre dos
+        two=[]
+        if self.planner is None or len(self.candidatos)==2:
+            two=top_two(self.candidatos, self.hechos, self.index, self.cand_mask, self.levels); tr.lap("top_two")
+        if len(two)==2:
+            dq=discriminating_question(two[0], two[1], self.hechos, self.asked_pairs); tr.lap("discriminating_question")
+            if dq is not None:
+                tr.took("discriminating")
+                self._ask(dq)
+                return self._question(dq)
+
+        best, prob, _ = candidate_probability(self.candidatos, self.hechos, self.index, self.cand_mask, self.levels); tr.lap("candidate_probability")
+        if best is not None and prob>=PREFETCH_PROB: self.likely=[c["nombre"] for c in two] or [best["nombre"]]
+        if best is not None and prob>=PROB_CONFIRM:
+            q, expected, txt = self.pick_special_from_data(best["nombre"]); tr.lap("pick_special")
+            if q is not None:
+                tr.took("confirm")
+                self.pending_confirm=(best["nombre"], q, expected, txt)
+                self._ask(q)
+                return self._question(q, txt)
+            tr.took("probable"); return self._result(best["nombre"], False)
+
+        q=None
+        if self.planner is not None:
+            q=self.planner.choose(self.cand_mask, self.hechos, self.asked_pairs); tr.lap("lookahead")
+            if q is not None: tr.took("lookahead")
+        if q is None:
+            q=best_question_entropy(self.candidatos, self.hechos, self.asked_pairs, self.index, self.cand_mask); tr.lap("entropy")
+            if q is None:
+                tr.took("entropy_exhausted")
+                if best is not None: return self._result(best["nombre"], False)
+                return self._empty()
+            tr.took("entropy")
+        self._ask(q)
+        return self._question(q)
+
+    def _next_bayes(self, tr=_NO_TRACE):
+        if self.bayes.n==0: tr.took("empty"); return self._empty()
+        post=self.bayes.posterior(self.logp); tr.lap("posterior")
+        best=int(post.argmax()); prob=float(post[best])
+        nombre=self.index.personajes[best]["nombre"]
+        if prob>=PREFETCH_PROB:
+            top=np.argsort(post)[::-1][:PREFETCH_CANDIDATES]
+            self.likely=[self.index.personajes[int(i)]["nombre"] for i in top if post[i]>=PREFETCH_MIN_SHARE]
+        if self.q_count>=QUESTION_MIN_REVEAL and (prob>=PROB_CONFIRM or self.q_count>=BAYES_MAX_Q):
+            tr.took("bayes_result"); return self._result(nombre, prob>=PROB_CONFIRM)
+        q=self.bayes.best_question(post, self.asked_pairs); tr.lap("info_gain")
+        if q is None: tr.took("bayes_exhausted"); return self._result(nombre, False)
+        tr.took("bayes_question")
+        self._ask(q)
+        return self._question(q)
+
+    def _apply_answer(self, q, ans):
+        if q[0]=='bool':
+            a=q[1]
+            if ans is True: self.hechos[a]=True
+            elif ans is False: self.negaciones.add((a, True))
+        else:
+            _,a,v=q
+            if ans is True: self.hechos[a]=v
+            elif ans is False: self.negaciones.add((a,v))
+
+    # Cada respuesta apila una instantánea (referencias, no copias): los
+    # contenedores se reemplazan al modificarse (copy-on-write, solo el que
+    # cambia) y candidatos se decodifica de cand_mask al pedirlo, así que
+    # deshacer/rehacer es O(1) y nunca vuelve a filtrar el roster.
+    SNAP_FIELDS=("cand_mask","levels","hechos","negaciones","asked_pairs","first_attrs",
+                 "q_count","history","pending_confirm","qtuple","step","logp")
+
+    def _snapshot(self): return tuple(getattr(self,f) for f in self.SNAP_FIELDS)
+
+    def _restore(self, snap):
+        for f,v in zip(self.SNAP_FIELDS, snap): setattr(self, f, v)
+        return self.step
+
+    @property
+    def candidatos(self):
+        # filas vivas de cand_mask; se decodifican una vez por máscara
+        if self._cands is None or self._cands[0] is not self.cand_mask:
+            self._cands=(self.cand_mask, self.index.members(self.cand_mask))
+        return self._cands[1]
+
+    def _ask(self, q): self.asked_pairs=self.asked_pairs|{q}
+
+    def replay(self, history):
+        # reconstruye el estado tras un prefijo de respuestas sin elegir preguntas
+        for q,ans in history:
+            self._ask(q)
+            if self.q_count < QUESTION_MIN_REVEAL: self.first_attrs=self.first_attrs|{q[1]}
+            self.qtuple=q; self._record(ans); self.pending_confirm=None
+        self.qtuple=None
+        return self
+
+    def answer(self, ans):
+        if not self.qtuple: return self.step
+        tr=self._trace("answer", ans)
+        self._record(ans); tr.lap("narrow")
+        if self.pending_confirm is not None:
+            name,q,expected,_=self.pending_confirm
+            ok = (ans is True) if q[0]=='cat' else ((expected is True and ans is True) or (expected is False and ans is False))
+            self.pending_confirm=None
+            if ok: tr.took("confirmed"); self._result(name, True); return self._traced(tr)
+        self.qtuple=None; self._next(tr)
+        return self._traced(tr)
+
+    def _record(self, ans):
+        self.undo_stack.append(self._snapshot()); self.redo_stack.clear()
+        if ans is True: self.hechos=dict(self.hechos)
+        elif ans is False: self.negaciones=set(self.negaciones)
+        self.history=self.history+((self.qtuple, ans),); self.q_count+=1
+        f=fact_of(self.qtuple, ans)
+        # un hecho que sobrescribe otro distinto no es un AND: se recalcula desde el índice
+        overwrite = ans is True and f[0] in self.hechos and self.hechos[f[0]]!=f[1]
+        new_fact = ans is True and f[0] not in self.hechos
+        self._apply_answer(self.qtuple, ans)
+        if overwrite:
+            self.cand_mask=self.index.mask_for(self.hechos, self.negaciones)
+            if self.bayes is None: self.levels=self.index.match_levels(self.hechos)
+        else:
+            self.cand_mask=self.index.narrow(self.cand_mask, self.qtuple, ans)
+            if new_fact and self.bayes is None: self.levels=self.index.add_match(self.levels, *f)
+        if self.bayes is not None: self.logp=self.bayes.update(self.logp, self.qtuple, ans)
+
+    def undo(self):
+        # vuelve a la pregunta anterior tal cual se hizo
+        if not self.undo_stack: return None
+        self.redo_stack.append(self._snapshot())
+        return self._restore(self.undo_stack.pop())
+
+    def redo(self):
+        if not self.redo_stack: return None
+        self.undo_stack.append(self._snapshot())
+        return self._restore(self.redo_stack.pop())
+
 # --------------- Formulario (scroll fijo y arriba) ---------------
-class AddCharacterForm(tk.Frame):
-    def __init__(self, master, dominios, prefill, theme, on_save, on_cancel, get_catalog, set_catalog):
+class AddCharacterForm(tk.Frame if tk else object):
+    def __init__(self, master, dominios, prefill, theme, on_save, on_cancel, get_catalog, set_catalog, check_name=None):
         super().__init__(master, bg=theme["panel"])
         self.dom=dominios; self.prefill=prefill or {}; self.theme=theme
         self.on_save=on_save; self.on_cancel=on_cancel
         self.get_catalog=get_catalog; self.set_catalog=set_catalog
+        self.check_name=check_name; self._hint_job=None
         self.selected_photo=None
         self._build()
 
@@ -332,6 +2368,9 @@ class AddCharacterForm(tk.Frame):
         tk.Label(basics, text="Nombre", bg=t["panel"], fg=t["fg"]).grid(row=0, column=0, sticky="w", padx=6, pady=4)
         self.name_var=tk.StringVar()
         tk.Entry(basics, textvariable=self.name_var).grid(row=0, column=1, sticky="ew", padx=6, pady=4, columnspan=2)
+        self.name_hint=tk.Label(basics, text="", bg=t["panel"], fg="#ffd27f", anchor="w")
+        self.name_hint.grid(row=6, column=0, columnspan=3, sticky="ew", padx=6, pady=(0,4))
+        if self.check_name: self.name_var.trace_add("write", self._on_name_typed)
 
         pos_vals=["Portero","Defensa","Medio","Delantero"]
         nac_vals=sorted(set(list(self.dom.get("nacionalidad", [])) + ["Argentina","Brasil","España","Francia","Alemania","México","Portugal"]))
@@ -414,6 +2453,16 @@ class AddCharacterForm(tk.Frame):
             r+=1
         self._feat_next_row=r
 
+    def _on_name_typed(self, *_):
+        # aviso de jugadores existentes mientras se escribe (agrupando teclas)
+        if self._hint_job is not None: self.after_cancel(self._hint_job)
+        self._hint_job=self.after(120, self._show_name_hint)
+
+    def _show_name_hint(self):
+        self._hint_job=None
+        name=self.name_var.get().strip()
+        self.name_hint.config(text=self.check_name(name)[0] if name else "")
+
     def _refresh_catalog(self):
         self.set_catalog(load_catalog()); self._build_feature_rows(); self.add_msg.config(text="Catálogo actualizado.")
 
@@ -436,7 +2485,7 @@ class AddCharacterForm(tk.Frame):
         self.added_box.insert("end", f"{qtxt} → {'Sí' if val else 'No'}")
         if self.chk_add_to_catalog.get()==1:
             cat=self.get_catalog().copy(); cat[key]=qtxt
-            save_catalog(cat); self.set_catalog(cat); self._build_feature_rows()
+            add_catalog_entry(key, qtxt); self.set_catalog(cat); self._build_feature_rows()
             self.add_msg.config(text="Agregada y catálogo actualizado.")
         else:
             self.add_msg.config(text="Agregada al jugador.")
@@ -445,6 +2494,9 @@ class AddCharacterForm(tk.Frame):
     def _save_click(self):
         name=self.name_var.get().strip()
         if not name: self.add_msg.config(text="Pon un nombre antes de guardar."); return
+        if self.check_name:
+            msg,dup=self.check_name(name)
+            if dup: self.add_msg.config(text=msg); return
         attrs, rules = {}, []
         if self.cb_pos.get():  attrs["posicion"]=self.cb_pos.get()
         if self.cb_nac.get():  attrs["nacionalidad"]=self.cb_nac.get()
@@ -473,7 +2525,7 @@ class AddCharacterForm(tk.Frame):
         if self.on_save: self.on_save(name, attrs, rules)
 
 # --------------- App ---------------
-class AkinatorApp(tk.Tk):
+class AkinatorApp(tk.Tk if tk else object):
     def __init__(self):
         super().__init__()
         self.title("Akinator — Futbolistas")
@@ -494,37 +2546,92 @@ class AkinatorApp(tk.Tk):
         s.configure("Accent.TButton", font=("Helvetica",12,"bold"), foreground="#ffffff")
         s.map("Accent.TButton", background=[("!disabled",self.theme["accent"]),("active",self.theme["accent2"])], foreground=[("!disabled","#ffffff")])
 
-        self.catalog=load_catalog()
-        self.personajes=load_dataset()
-        self.dominios=build_domains(self.personajes)
-        self.hechos, self.negaciones = {}, set()
-        self.asked_pairs=set(); self.candidatos=self.personajes[:]
-        self.qtuple=None; self.q_count=0
-        self.history=[]; self.pending_confirm=None
-        self.first_attrs=set(); self.allow_add_now=False
-
-        self.welcome_photo=self._load_welcome(WELCOME_IMAGE, max_w=760, max_h=280)
+        # roster, PIL y foto de bienvenida se cargan tras el primer frame
+        self.roster=None; self.session=None; self.catalog={}
+        self.personajes=[]; self.dominios={}; self.allow_add_now=False
+        self._logged=None; self._ending=None  # partida ya anotada en OUTCOME_LOG / final a anotar
+        self._names_job=None; self.start_btn=None
+        self.welcome_photo=None; self.welcome_lbl=None
+        self._ui_calls=queue.Queue()
+        if STARTUP: STARTUP.add("tk window", STARTUP.last)
 
         self.root=ttk.Frame(self, style="Root.TFrame"); self.root.pack(fill="both", expand=True, padx=16, pady=16)
         self.show_welcome()
+        self.after(IMAGE_POLL_MS, self._poll_background)
+        self.after_idle(self._after_first_frame)
+
+    def _after_first_frame(self):
+        if STARTUP: STARTUP.add("first frame", STARTUP.last)
+        threading.Thread(target=self._warm_roster, daemon=True).start()
+        self._load_welcome(WELCOME_IMAGE, max_w=760, max_h=280)
+
+    def _warm_roster(self):
+        r=Roster.current(STARTUP); self._ui_calls.put(lambda: self._set_roster(r))
+        if STARTUP: STARTUP.done("roster", self._ui_calls)
+        r.names()  # índice de nombres listo antes de abrir el formulario de alta
+        if PRIORS_FROM_LOG:
+            try: load_priors(roster=r)
+            except OSError: pass
+
+    def _set_roster(self, r):
+        # en el hilo de Tk; un hilo que terminó tarde no pisa uno más nuevo
+        if self.roster is None or r is Roster._current: self.roster=r
+        if self.start_btn is not None and self.start_btn.winfo_exists(): self.start_btn.config(state="normal")
+
+    def _reload_roster(self, then=None):
+        # Roster.current() (stat y, si cambió el dataset, carga) fuera del hilo
+        # de Tk; then() corre en Tk con self.roster ya al día
+        def job():
+            r=Roster.current()
+            def done():
+                self._set_roster(r)
+                if then: then()
+            self._ui_calls.put(done)
+        threading.Thread(target=job, daemon=True).start()
 
     def get_catalog(self): return self.catalog
     def set_catalog(self, cat): self.catalog=cat
 
     def _load_welcome(self, path, max_w=760, max_h=280):
-        if not os.path.exists(path): return None
-        try:
-            if PIL_OK:
-                im=Image.open(path); im.thumbnail((max_w,max_h), Image.LANCZOS)
-                return ImageTk.PhotoImage(im)
-            img=tk.PhotoImage(file=path)
-            w,h=img.width(),img.height()
-            fx=max(1,int(w/max_w)) if w>max_w else 1
-            fy=max(1,int(h/max_h)) if h>max_h else 1
-            if fx>1 or fy>1: img=img.subsample(fx,fy)
-            return img
-        except Exception:
-            return None
+        if not os.path.exists(path):
+            if STARTUP: STARTUP.done("welcome", self._ui_calls)
+            return
+        t=time.perf_counter()
+        def ready(photo):
+            if STARTUP: STARTUP.add("welcome image decode", t); STARTUP.done("welcome", self._ui_calls)
+            if photo is None: return
+            self.welcome_photo=photo
+            if self.welcome_lbl is not None and self.welcome_lbl.winfo_exists():
+                self.welcome_lbl.config(image=photo); self.welcome_lbl.pack(padx=8, pady=(8,0), before=self.welcome_title)
+        def job():
+            # importar PIL también sale del hilo de Tk
+            if pil_ok(): IMAGES.request(path, (max_w,max_h), lambda im: ready(ImageTk.PhotoImage(im) if im is not None else None))
+            else: self._ui_calls.put(lambda: ready(load_image_for_ui(path, max_w, max_h)))
+        threading.Thread(target=job, daemon=True).start()
+
+    def _poll_background(self):
+        IMAGES.drain()
+        while True:
+            try: fn=self._ui_calls.get_nowait()
+            except queue.Empty: break
+            fn()
+        self.after(IMAGE_POLL_MS, self._poll_background)
+
+    def _prefetch_likely(self):
+        if not pil_ok(): return
+        for nombre in self.session.likely:
+            path=find_character_image(nombre)
+            if path is not None: IMAGES.prefetch(path, REVEAL_PHOTO_SIZE)
+
+    def _show_photo(self, frame, nombre, im):
+        if not frame.winfo_exists(): return
+        for w in frame.winfo_children(): w.destroy()
+        if im is None:
+            tk.Label(frame, text=f"(Agrega la foto en ./images/{slugify(nombre)}.png|jpg|gif)", bg=self.theme["card"], fg="#ccead8").pack()
+            return
+        img=ImageTk.PhotoImage(im)
+        tk.Label(frame, image=img, bg=self.theme["card"]).pack()
+        frame.image=img
 
     def _clear(self):
         for w in self.root.winfo_children(): w.destroy()
@@ -532,19 +2639,36 @@ class AkinatorApp(tk.Tk):
     def show_welcome(self):
         self._clear()
         banner=ttk.Frame(self.root, style="Banner.TFrame"); banner.pack(fill="x", pady=(0,10))
+        self.welcome_lbl=tk.Label(banner, bg=self.theme["panel"])
         if self.welcome_photo is not None:
-            tk.Label(banner, image=self.welcome_photo, bg=self.theme["panel"]).pack(padx=8, pady=(8,0))
-        ttk.Label(banner, text="ADIVINARÉ TU FUTBOLISTA ¿ESTÁS LISTO?", style="Title.TLabel").pack(padx=12, pady=10)
+            self.welcome_lbl.config(image=self.welcome_photo); self.welcome_lbl.pack(padx=8, pady=(8,0))
+        self.welcome_title=ttk.Label(banner, text="ADIVINARÉ TU FUTBOLISTA ¿ESTÁS LISTO?", style="Title.TLabel")
+        self.welcome_title.pack(padx=12, pady=10)
         tk.Frame(banner, height=2, bg=self.theme["accent"]).pack(side="bottom", fill="x")
         card=ttk.Frame(self.root, style="Card.TFrame"); card.pack(fill="both", expand=True, padx=6, pady=6)
-        ttk.Button(card, text="Comenzar", style="Accent.TButton", command=self.start_game).pack(pady=28)
+        # se habilita cuando _warm_roster termina: pulsarlo antes esperaría la carga en el hilo de Tk
+        self.start_btn=ttk.Button(card, text="Comenzar", style="Accent.TButton", command=self.start_game,
+                                  state="normal" if self.roster is not None else "disabled")
+        self.start_btn.pack(pady=28)
+
+    def _log_game(self, outcome, final=None, final_attrs=None):
+        # una línea por partida, la primera vez que se sabe cómo terminó;
+        # los priors resuelven el final con el roster de la partida
+        s=self.session
+        if s is None or s is self._logged or not s.history: return
+        self._logged=s
+        try: log_outcome(s.outcome_record(outcome, final), s.roster, final_attrs)
+        except OSError: pass
 
     def start_game(self):
-        self.catalog=load_catalog(); self.personajes=load_dataset(); self.dominios=build_domains(self.personajes)
-        self.hechos, self.negaciones = {}, set()
-        self.asked_pairs=set(); self.candidatos=self.personajes[:]
-        self.qtuple=None; self.q_count=0
-        self.history=[]; self.pending_confirm=None; self.first_attrs=set()
+        # con el roster que ya hay; los cambios de otros procesos llegan en
+        # segundo plano para la partida siguiente
+        if self.roster is None: return
+        self._log_game(self._ending or "abandoned"); self._ending=None
+        self._reload_roster()
+        self.catalog=dict(self.roster.catalog)
+        self.personajes=self.roster.personajes; self.dominios=self.roster.dominios
+        self.session=GameSession(self.roster)
         self.allow_add_now=False
         self.show_play()
         if len(self.personajes)==0:
@@ -571,128 +2695,44 @@ class AkinatorApp(tk.Tk):
         tk.Frame(self.bottom, height=2, bg=self.theme["accent"]).pack(side="top", fill="x")
         inner=ttk.Frame(self.bottom, style="Banner.TFrame"); inner.pack(pady=8)
         ttk.Button(inner, text="Regresar", style="Accent.TButton", command=self.undo_last).pack(side="left", padx=8)
+        ttk.Button(inner, text="Rehacer", style="Accent.TButton", command=self.redo_last).pack(side="left", padx=8)
         ttk.Button(inner, text="Reiniciar", style="Accent.TButton", command=self.start_game).pack(side="left", padx=8)
         self.next_step()
 
-    BASIC_SET=["posicion","nacionalidad"]; PHYS_SET=["liga"]
-
-    def pick_question_phased(self, cands):
-        if self.q_count < PHASE_BASIC_Q:
-            pool=[a for a in self.BASIC_SET if a not in getattr(self,'first_attrs',set())]
-            random.shuffle(pool); q=_best_from_pool(cands, self.hechos, self.asked_pairs, pool)
-            if q: return q
-        if self.q_count < PHASE_BASIC_Q + PHASE_PHYS_Q:
-            pool=[a for a in self.PHYS_SET if a not in getattr(self,'first_attrs',set())]
-            random.shuffle(pool); q=_best_from_pool(cands, self.hechos, self.asked_pairs, pool)
-            if q: return q
-        catalog_keys=list(self.catalog.keys())
-        pool=[a for a in catalog_keys + list(set(CORE_ATTRS)-set(self.BASIC_SET)-set(self.PHYS_SET)) if a not in getattr(self,'first_attrs',set())]
-        random.shuffle(pool); return _best_from_pool(cands, self.hechos, self.asked_pairs, pool)
-
-    def recompute_candidates(self): self.candidatos=filter_candidates(self.personajes, self.hechos, self.negaciones)
     def set_question(self, txt): self.lbl_q.config(text=txt)
 
-    def pick_special_from_data(self, name):
-        for p in self.personajes:
-            if p.get("nombre")==name:
-                for rule in p.get("confirm", []):
-                    a, expected = rule["attr"], rule["value"]
-                    if (a in self.hechos and self.hechos[a]==expected) or ((a,expected) in self.negaciones): continue
-                    q=('bool',a) if isinstance(expected,bool) else ('cat',a,expected)
-                    return q, expected, rule.get("question")
-        return None, None, None
-
-    def next_step(self):
-        self.recompute_candidates()
-        if not self.candidatos:
+    def render_step(self, step):
+        if step["type"]=="question":
+            self.set_question(step["text"]); self._prefetch_likely()
+        elif step["type"]=="result":
+            self.present_result(step["nombre"], certain=step["certain"])
+        else:
             try: self.answer_btns.destroy()
             except: pass
-            self.pending_confirm=None; self.qtuple=None
-            self.allow_add_now=True
+            self.allow_add_now=True; self._ending="empty"
             self.set_question("No encuentro coincidencias. ¿Deseas agregar futbolista?")
-            self.show_add_prompt(); return
-
-        if self.q_count < QUESTION_MIN_REVEAL:
-            q=self.pick_question_phased(self.candidatos)
-            if q is None: q=('bool','gano_mundial')
-            self.qtuple=q; self.asked_pairs.add(q); self.first_attrs.add(q[1])
-            self.set_question(question_text(q, self.catalog)); return
-
-        if len(self.candidatos)==1:
-            self.present_result(self.candidatos[0]["nombre"], certain=True); return
-
-        if self.pending_confirm is not None:
-            _, q, _, txt = self.pending_confirm
-            self.qtuple=q; self.set_question(txt if txt else question_text(q, self.catalog)); return
-
-        two=top_two(self.candidatos, self.hechos)
-        if len(two)==2:
-            dq=discriminating_question(two[0], two[1], self.hechos, self.asked_pairs)
-            if dq is not None:
-                self.qtuple=dq; self.asked_pairs.add(dq)
-                self.set_question(question_text(dq, self.catalog)); return
-
-        best, prob, _ = candidate_probability(self.candidatos, self.hechos)
-        if best is not None and prob>=PROB_CONFIRM:
-            q, expected, txt = self.pick_special_from_data(best["nombre"])
-            if q is not None:
-                self.pending_confirm=(best["nombre"], q, expected, txt)
-                self.asked_pairs.add(q); self.qtuple=q
-                self.set_question(txt if txt else question_text(q, self.catalog)); return
-            self.present_result(best["nombre"], certain=False); return
+            self.show_add_prompt()
 
-        q=best_question_entropy(self.candidatos, self.hechos, self.asked_pairs)
-        if q is None:
-            if best is not None: self.present_result(best["nombre"], certain=False)
-            else:
-                self.allow_add_now=True
-                self.set_question("No encuentro coincidencias. ¿Deseas agregar futbolista?")
-                self.show_add_prompt()
-            return
-        self.qtuple=q; self.asked_pairs.add(q)
-        self.set_question(question_text(q, self.catalog))
+    def next_step(self): self.render_step(self.session.next_question())
 
     def answer(self, ans):
-        if not self.qtuple: return
-        self.history.append((self.qtuple, ans)); self.q_count+=1
-        if self.qtuple[0]=='bool':
-            a=self.qtuple[1]
-            if ans is True: self.hechos[a]=True
-            elif ans is False: self.negaciones.add((a, True))
-        else:
-            _,a,v=self.qtuple
-            if ans is True: self.hechos[a]=v
-            elif ans is False: self.negaciones.add((a,v))
-
-        if self.pending_confirm is not None:
-            name,q,expected,_=self.pending_confirm
-            ok = (ans is True) if q[0]=='cat' else ((expected is True and ans is True) or (expected is False and ans is False))
-            self.pending_confirm=None
-            if ok: self.present_result(name, certain=True); return
-        self.qtuple=None; self.next_step()
+        if not self.session.qtuple: return
+        self.render_step(self.session.answer(ans))
 
     def undo_last(self):
-        if not self.history:
+        step=self.session.undo()
+        if step is None:
             self.set_question("No hay nada para deshacer."); return
-        self.history.pop()
-        self.hechos, self.negaciones = {}, set()
-        self.asked_pairs, self.qtuple = set(), None
-        self.q_count=0; self.pending_confirm=None; self.first_attrs=set()
-        for q,ans in self.history:
-            self.asked_pairs.add(q); self.q_count+=1
-            if self.q_count<=QUESTION_MIN_REVEAL: self.first_attrs.add(q[1])
-            if q[0]=='bool':
-                a=q[1]
-                if ans is True: self.hechos[a]=True
-                elif ans is False: self.negaciones.add((a, True))
-            else:
-                _,a,v=q
-                if ans is True: self.hechos[a]=v
-                elif ans is False: self.negaciones.add((a,v))
         for w in self.photo_frame.winfo_children(): w.destroy()
         for w in self.options_frame.winfo_children(): w.destroy()
         for w in self.confirm_frame.winfo_children(): w.destroy()
-        self.set_question("Respuesta anterior deshecha."); self.next_step()
+        self.set_question("Respuesta anterior deshecha."); self.render_step(step)
+
+    def redo_last(self):
+        step=self.session.redo()
+        if step is None:
+            self.set_question("No hay nada para rehacer."); return
+        self.render_step(step)
 
     def present_result(self, nombre, certain=True):
         try: self.answer_btns.destroy()
@@ -704,20 +2744,33 @@ class AkinatorApp(tk.Tk):
         for w in self.confirm_frame.winfo_children(): w.destroy()
         msg = f"🎯 Futbolista: «{nombre}». ¿Acerté?" if certain else f"Mi mejor respuesta: «{nombre}». ¿Acerté?"
         self.set_question(msg)
-        path=find_character_image(nombre); img=load_image_for_ui(path)
-        if img is not None:
-            tk.Label(self.photo_frame, image=img, bg=self.theme["card"]).pack()
-            self.photo_frame.image=img
+        path=find_character_image(nombre)
+        if path is not None and pil_ok() and IMAGES.cached(path, REVEAL_PHOTO_SIZE):
+            self._show_photo(self.photo_frame, nombre, IMAGES.thumbnail(path, REVEAL_PHOTO_SIZE))
+        elif path is not None and pil_ok():
+            # la tarjeta se pinta ya; la foto llega por la cola de IMAGES
+            tk.Label(self.photo_frame, text="(cargando foto…)", bg=self.theme["card"], fg="#ccead8").pack()
+            IMAGES.request(path, REVEAL_PHOTO_SIZE, lambda im, f=self.photo_frame: self._show_photo(f, nombre, im))
         else:
-            tk.Label(self.photo_frame, text=f"(Agrega la foto en ./images/{slugify(nombre)}.png|jpg|gif)", bg=self.theme["card"], fg="#ccead8").pack()
+            img=load_image_for_ui(path)
+            if img is not None:
+                tk.Label(self.photo_frame, image=img, bg=self.theme["card"]).pack()
+                self.photo_frame.image=img
+            else:
+                tk.Label(self.photo_frame, text=f"(Agrega la foto en ./images/{slugify(nombre)}.png|jpg|gif)", bg=self.theme["card"], fg="#ccead8").pack()
         ttk.Button(self.options_frame, text="Sí", style="Accent.TButton",
-                   command=lambda: self.set_question(f"¡Listo! Era «{nombre}».")).pack(side="left", padx=6)
+                   command=lambda: self.after_reveal_yes(nombre)).pack(side="left", padx=6)
         ttk.Button(self.options_frame, text="Intentar de nuevo", style="Accent.TButton",
                    command=self.start_game).pack(side="left", padx=6)
         ttk.Button(self.options_frame, text="No", style="Accent.TButton",
                    command=self.after_reveal_no).pack(side="left", padx=6)
 
+    def after_reveal_yes(self, nombre):
+        self._log_game("win", nombre)
+        self.set_question(f"¡Listo! Era «{nombre}».")
+
     def after_reveal_no(self):
+        if self.session is not self._logged: self._ending="wrong"
         self.set_question("¿Deseas agregar futbolista?")
         self.allow_add_now=True
         self.show_add_prompt()
@@ -736,7 +2789,7 @@ class AkinatorApp(tk.Tk):
     def show_add_form_gate(self):
         # NUEVO: limpiamos la tarjeta y pintamos el form ARRIBA
         self.allow_add_now=False
-        self._render_add_panel(prefill=self.hechos)
+        self._render_add_panel(prefill=self.session.hechos)
 
     def _render_add_panel_header(self):
         # encabezado simple para el modo alta
@@ -756,22 +2809,97 @@ class AkinatorApp(tk.Tk):
             on_save=self.save_new_character,
             on_cancel=self.start_game,
             get_catalog=self.get_catalog,
-            set_catalog=self.set_catalog
+            set_catalog=self.set_catalog,
+            check_name=self.check_name
         )
         # Fill + expand para ocupar arriba; el Canvas dentro se encarga del scroll
         form.pack(fill="both", expand=True, padx=8, pady=(0,8), anchor="n")
 
+    def _name_roster(self):
+        # roster que ya tiene la app si su NameIndex está hecho; si no, se
+        # construye en otro hilo y mientras tanto no hay avisos (el alta con
+        # unique=True sigue rechazando duplicados)
+        r=self.roster
+        if r is None: return None
+        if r.names_ready(): return r
+        if self._names_job is None or not self._names_job.is_alive():
+            self._names_job=threading.Thread(target=r.names, daemon=True); self._names_job.start()
+        return None
+
+    def check_name(self, name):
+        # -> (aviso, duplicado) para el formulario de alta
+        roster=self._name_roster()
+        if roster is None: return "", False
+        names=roster.names()
+        same=names.by_slug(name)
+        if same: return f"Ya existe «{roster.cols.name(same[0])}».", True
+        near=names.similar(name)
+        if near: return "Parecidos: "+", ".join(roster.cols.name(r) for r,_ in near), False
+        return "", False
+
     def save_new_character(self, name, attrs, rules):
         if not name: self.set_question("Escribe un nombre para guardar."); return
+        dup=f"«{name}» ya está en el dataset."
+        r=self._name_roster()
+        if r is not None and r.names().by_slug(name): self.set_question(dup); return
         nuevo={"nombre":name,"atributos":attrs}
         if rules: nuevo["confirm"]=rules
-        personajes=load_dataset(); personajes.append(nuevo); save_dataset(personajes)
-        self.dominios=build_domains(personajes)
+        if not add_player(nuevo, unique=True): self.set_question(dup); return  # otro proceso se adelantó
+        self._log_game("added", name, attrs)
+        if self.roster is not None: self.roster.note_added(attrs); self.dominios=self.roster.dominios
         self.set_question(f"Se agregó «{name}». Iniciando nueva partida…")
-        self.after(650, self.start_game)
+        self._reload_roster(then=lambda: self.after(650, self.start_game))  # con el alta ya en el roster
+
+# ---------------- Arranque ----------------
+class StartupProfile:
+    # Tiempos de arranque (--startup-profile o AKINATOR_STARTUP_PROFILE=1).
+    # Cada fase guarda inicio y duración desde el inicio del proceso; las que
+    # corren en segundo plano se solapan con la ventana ya visible.
+    WAIT=("roster","welcome")
+
+    def __init__(self):
+        self.rows=[("imports", _T0, _T_IMPORTED)]; self.last=_T_IMPORTED
+        self.pending=set(self.WAIT); self.lock=threading.Lock()
+
+    def add(self, name, t0):
+        t1=time.perf_counter()
+        with self.lock: self.rows.append((name, t0, t1)); self.last=t1
+
+    def done(self, task, ui_calls):
+        with self.lock:
+            self.pending.discard(task)
+            if self.pending: return
+        ui_calls.put(self.report)
+
+    def report(self, out=None):
+        out=out or sys.stderr
+        print("arranque (ms)         inicio   duración", file=out)
+        for name,t0,t1 in sorted(self.rows, key=lambda r: r[1]):
+            print(f"  {name:<20}{(t0-_T0)*1000:8.1f}{(t1-t0)*1000:11.1f}", file=out)
+        print(f"  {'total':<20}{'':8}{(max(r[2] for r in self.rows)-_T0)*1000:11.1f}", file=out)
+
+STARTUP=None
+_T_IMPORTED=time.perf_counter()
 
 # ---------------- Main ----------------
 if __name__ == "__main__":
+    if "--compile-roster" in sys.argv[1:]:
+        # recompila el binario aunque esté al día (p. ej. antes de lanzar muchos procesos)
+        try: os.remove(roster_bin_path())
+        except OSError: pass
+        t=time.perf_counter(); cols,_=load_roster_columns(compile=True)
+        print(f"{cols.n} futbolistas -> {roster_bin_path()} en {time.perf_counter()-t:.2f}s")
+        sys.exit(0)
+    if tk is None: sys.exit("La interfaz necesita tkinter (en Debian/Ubuntu: python3-tk).")
+    if "--startup-profile" in sys.argv[1:] or os.environ.get("AKINATOR_STARTUP_PROFILE"):
+        STARTUP=StartupProfile()
+    tel=os.environ.get("AKINATOR_TELEMETRY")
+    if "--telemetry" in sys.argv[1:]:
+        i=sys.argv.index("--telemetry"); tel=sys.argv[i+1] if i+1<len(sys.argv) else "futbol_telemetry.jsonl"
+    if tel: enable_telemetry(tel)
+    if "--no-priors" in sys.argv[1:]: PRIORS_FROM_LOG=False
     os.makedirs(IMAGES_DIR, exist_ok=True)
     app=AkinatorApp()
     app.mainloop()
+    if TELEMETRY is not None:
+        TELEMETRY.close(); print(json.dumps(TELEMETRY.summary(), ensure_ascii=False, indent=2), file=sys.stderr)
@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+# Importador masivo de futbolistas desde CSV o JSONL. Los registros pasan por
+# una cadena de generadores (leer -> jugador -> normalizar -> deduplicar ->
+# lotes) y cada lote se añade al journal con una sola escritura + fsync, así
+# que la memoria no depende del tamaño del archivo de entrada.
+#
+#   python akinator_import.py jugadores.csv [otro.jsonl ...] [--batch 5000]
+#                             [--question rasgo="¿Texto?"] [--compact] [--data ruta]
+#
+# CSV: columna "nombre" y una por atributo ("Sí"/"No", "true"/"false"... son
+# booleanos; vacío = sin dato); "confirm" opcional con la lista en JSON.
+# JSONL: un jugador por línea, {"nombre", "atributos", ...} o plano {"nombre", attr: valor}.
+import argparse, csv, hashlib, itertools, json, sys, time
+
+import akinator_futbol as af
+
+BATCH = 5000
+PROGRESS_EVERY = 5.0   # segundos entre líneas de progreso
+TRUE_WORDS = {"sí","si","s","yes","y","true","verdadero"}
+FALSE_WORDS = {"no","n","false","falso"}
+
+def _bool_or_text(v):
+    t=v.strip()
+    lo=t.lower()
+    if lo in TRUE_WORDS: return True
+    if lo in FALSE_WORDS: return False
+    return t
+
+def read_csv(path, delimiter=","):
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        yield from csv.DictReader(f, delimiter=delimiter)
+
+def read_jsonl(path):
+    with open(path, encoding="utf-8") as f:
+        for n,line in enumerate(f, 1):
+            line=line.strip()
+            if not line: continue
+            try: yield json.loads(line)
+            except ValueError: yield {"_error": f"{path}:{n}: JSON inválido"}
+
+def read_records(path, fmt=None, delimiter=","):
+    fmt=fmt or ("csv" if path.lower().endswith((".csv",".tsv")) else "jsonl")
+    if fmt=="csv": return read_csv(path, "\t" if path.lower().endswith(".tsv") else delimiter)
+    return read_jsonl(path)
+
+def to_player(rec):
+    # registro crudo -> {"nombre", "atributos", ...} o None si no sirve
+    if not isinstance(rec, dict) or "_error" in rec: return None
+    name=str(rec.get("nombre") or "").strip()
+    if not name: return None
+    if isinstance(rec.get("atributos"), dict):
+        p={k:v for k,v in rec.items() if k!="nombre"}; p["nombre"]=name
+        return p
+    p={"nombre":name, "atributos":{}}
+    for k,v in rec.items():
+        if k in ("nombre", None) or v is None: continue
+        if k=="confirm":
+            if isinstance(v, str):
+                if not v.strip(): continue
+                try: v=json.loads(v)
+                except ValueError: continue
+            p["confirm"]=v
+        elif isinstance(v, str):
+            if v.strip(): p["atributos"][k.strip()]=_bool_or_text(v)
+        else: p["atributos"][k.strip()]=v
+    return p
+
+def _name_key(name):
+    # 8 bytes por nombre visto en vez de la cadena: el conjunto de duplicados
+    # es lo único que crece con la entrada
+    return hashlib.blake2b(af.slugify(name).encode("utf-8"), digest_size=8).digest()
+
+def import_players(paths, batch=BATCH, questions=None, fmt=None, delimiter=",", progress=None):
+    st=af._store(); data=st.read()
+    catalog=dict(data["catalog"])
+    seen={_name_key(p.get("nombre","")) for p in data["personajes"]}
+    data=None
+    questions=dict(questions or {})
+    stats={"read":0, "imported":0, "duplicates":0, "invalid":0, "new_features":[]}
+
+    def records():
+        for path in paths:
+            yield from read_records(path, fmt, delimiter)
+
+    def players():
+        for rec in records():
+            stats["read"]+=1
+            p=to_player(rec)
+            if p is None: stats["invalid"]+=1; continue
+            yield af._normalize_player(p)
+
+    def unique(ps):
+        for p in ps:
+            k=_name_key(p["nombre"])
+            if k in seen: stats["duplicates"]+=1; continue
+            seen.add(k); yield p
+
+    def entries(ps):
+        # rasgos booleanos nuevos entran al catálogo justo antes del primer jugador que los usa
+        for p in ps:
+            for a,v in p["atributos"].items():
+                if isinstance(v, bool) and a not in catalog and a not in af.CORE_ATTRS:
+                    catalog[a]=questions.get(a) or af.question_text(("bool",a), catalog)
+                    stats["new_features"].append(a)
+                    yield {"op":"catalog", "key":a, "question":catalog[a]}
+            stats["imported"]+=1
+            yield {"op":"player", "data":p}
+
+    t0=time.perf_counter(); t_last=t0
+    it=entries(unique(players()))
+    while True:
+        chunk=list(itertools.islice(it, batch))
+        if not chunk: break
+        st.append_batch(chunk)
+        now=time.perf_counter()
+        if progress and now-t_last>=PROGRESS_EVERY:
+            t_last=now; progress(stats, now-t0)
+    stats["seconds"]=round(time.perf_counter()-t0, 3)
+    stats["rows_per_s"]=round(stats["read"]/stats["seconds"], 1) if stats["seconds"] else 0.0
+    return stats
+
+def _print_progress(stats, secs):
+    print(f"  {stats['read']} filas, {stats['imported']} nuevas ({stats['read']/secs:,.0f} filas/s)",
+          file=sys.stderr, flush=True)
+
+def _question(text):
+    key,sep,q=text.partition("=")
+    if not sep or not key.strip() or not q.strip(): raise argparse.ArgumentTypeError("usa rasgo=\"¿Pregunta?\"")
+    return key.strip(), q.strip()
+
+def main(argv=None):
+    ap=argparse.ArgumentParser(description="Importa futbolistas en bloque desde CSV/JSONL")
+    ap.add_argument("paths", nargs="+")
+    ap.add_argument("--format", choices=("csv","jsonl"), default=None, help="por defecto según la extensión")
+    ap.add_argument("--delimiter", default=",")
+    ap.add_argument("--batch", type=int, default=BATCH, help="registros por escritura al journal")
+    ap.add_argument("--question", type=_question, action="append", default=[],
+                    help="texto de la pregunta para un rasgo nuevo (rasgo=texto), repetible")
+    ap.add_argument("--compact", action="store_true", help="volcar el journal al JSON principal al terminar")
+    ap.add_argument("--data", default=None, help="ruta alternativa a futbol_dataset.json")
+    args=ap.parse_args(argv)
+    if args.data: af.DATAFILE=args.data
+    if args.batch<1: ap.error("--batch debe ser positivo")
+    stats=import_players(args.paths, args.batch, dict(args.question), args.format, args.delimiter, _print_progress)
+    if args.compact and stats["imported"]: af.compact_dataset()
+    print(f"{stats['read']} filas en {stats['seconds']:.2f}s ({stats['rows_per_s']:,.0f} filas/s): "
+          f"{stats['imported']} importados, {stats['duplicates']} duplicados, {stats['invalid']} inválidos")
+    if stats["new_features"]: print("Rasgos nuevos en el catálogo: "+", ".join(stats["new_features"]))
+
+if __name__ == "__main__":
+    main()
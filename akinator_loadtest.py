@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+# Cliente de carga para akinator_server.py: N partidas concurrentes contra
+# objetivos del dataset; mide la latencia por pregunta (p50/p99).
+#
+#   python akinator_loadtest.py --sessions 1000 --port 8765 [--ws] [--json out.json]
+import asyncio, argparse, base64, json, os, random, struct, time
+
+import akinator_futbol as af
+from akinator_server import ws_read
+
+def percentile(xs, p):
+    if not xs: return 0.0
+    xs=sorted(xs); k=(len(xs)-1)*p/100.0
+    lo=int(k); hi=min(lo+1, len(xs)-1)
+    return xs[lo]+(xs[hi]-xs[lo])*(k-lo)
+
+def answer_for(target, q):
+    attrs=target.get("atributos",{})
+    if q[1] not in attrs: return None
+    if q[0]=="bool": return attrs[q[1]] is True
+    return attrs[q[1]]==q[2]
+
+class HttpClient:
+    def __init__(self, host, port): self.host=host; self.port=port
+
+    async def open(self): self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+
+    async def call(self, method, path, body=None):
+        data=json.dumps(body).encode() if body is not None else b""
+        self.writer.write((f"{method} {path} HTTP/1.1\r\nHost: {self.host}\r\n"
+                           f"Content-Type: application/json\r\nContent-Length: {len(data)}\r\n\r\n").encode("latin-1")+data)
+        await self.writer.drain()
+        await self.reader.readline()
+        n=0
+        while True:
+            h=await self.reader.readline()
+            if h in (b"\r\n", b""): break
+            k,_,v=h.decode("latin-1").partition(":")
+            if k.strip().lower()=="content-length": n=int(v)
+        return json.loads(await self.reader.readexactly(n))
+
+    async def close(self):
+        self.writer.close()
+        try: await self.writer.wait_closed()
+        except Exception: pass
+
+class WsClient(HttpClient):
+    async def open(self):
+        await super().open()
+        key=base64.b64encode(os.urandom(16)).decode()
+        self.writer.write((f"GET /ws HTTP/1.1\r\nHost: {self.host}\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                           f"Sec-WebSocket-Key: {key}\r\nSec-WebSocket-Version: 13\r\n\r\n").encode("latin-1"))
+        await self.writer.drain()
+        while (await self.reader.readline()) not in (b"\r\n", b""): pass
+
+    async def send(self, msg):
+        data=json.dumps(msg).encode(); mask=os.urandom(4); n=len(data)
+        head=struct.pack("!BB", 0x81, 0x80|n) if n<126 else struct.pack("!BBH", 0x81, 0x80|126, n)
+        self.writer.write(head+mask+bytes(c^mask[i&3] for i,c in enumerate(data)))
+        await self.writer.drain()
+        _, payload = await ws_read(self.reader)
+        return json.loads(payload)
+
+class Hold:
+    # retiene las partidas terminadas (sesión aún viva en el servidor) hasta
+    # que run() lea /stats; las que fallan antes cuentan igual como llegadas
+    def __init__(self, n):
+        self.left=n; self.all_in=asyncio.Event(); self.release=asyncio.Event()
+        if n<=0: self.all_in.set()
+
+    def check_in(self):
+        self.left-=1
+        if self.left==0: self.all_in.set()
+
+async def play_one(client, target, lat, use_ws, hold, max_q=60):
+    try: await client.open()
+    except BaseException: hold.check_in(); raise
+    arrived=False
+    try:
+        t=time.perf_counter()
+        r=await (client.send({"op":"new"}) if use_ws else client.call("POST", "/sessions"))
+        lat.append(time.perf_counter()-t)
+        sid=r["id"]; n=0
+        while r["step"] and r["step"]["type"]=="question" and n<max_q:
+            ans=answer_for(target, r["step"]["q"])
+            t=time.perf_counter()
+            r=await (client.send({"op":"answer","answer":ans}) if use_ws else client.call("POST", f"/sessions/{sid}/answer", {"answer":ans}))
+            lat.append(time.perf_counter()-t); n+=1
+        step=r["step"] or {}
+        hold.check_in(); arrived=True; await hold.release.wait()
+        if not use_ws: await client.call("DELETE", f"/sessions/{sid}")
+        return n, step.get("type")=="result" and step.get("nombre")==target["nombre"]
+    finally:
+        if not arrived: hold.check_in()
+        await client.close()
+
+async def run(host, port, sessions, use_ws, seed):
+    rng=random.Random(seed)
+    roster=af.load_dataset()
+    if not roster: raise SystemExit("El dataset está vacío: no hay objetivos para jugar.")
+    targets=[rng.choice(roster) for _ in range(sessions)]
+    lat=[]; cls=WsClient if use_ws else HttpClient; hold=Hold(sessions)
+    t0=time.perf_counter()
+    games=asyncio.gather(*(play_one(cls(host, port), t, lat, use_ws, hold) for t in targets), return_exceptions=True)
+    await hold.all_in.wait()
+    wall=time.perf_counter()-t0
+    # con todas las sesiones aún abiertas: session_bytes_* mide partidas terminadas, no un hub vacío
+    c=HttpClient(host, port)
+    try: await c.open(); stats=await c.call("GET", "/stats")
+    finally: hold.release.set(); await c.close()
+    res=await games
+    ok=[r for r in res if not isinstance(r, BaseException)]
+    return {"sessions":sessions, "transport":"ws" if use_ws else "http", "errors":len(res)-len(ok),
+            "requests":len(lat), "wall_s":round(wall,3), "games_per_s":round(len(ok)/wall,2) if wall else 0.0,
+            "solved":sum(1 for _,s in ok if s), "mean_questions":round(sum(n for n,_ in ok)/len(ok),2) if ok else 0.0,
+            "latency_ms":{"p50":round(percentile(lat,50)*1000,3), "p90":round(percentile(lat,90)*1000,3),
+                          "p99":round(percentile(lat,99)*1000,3), "max":round(max(lat)*1000,3) if lat else 0.0},
+            "server":stats}
+
+def main(argv=None):
+    ap=argparse.ArgumentParser(description="Prueba de carga del servidor del Akinator")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--sessions", type=int, default=1000)
+    ap.add_argument("--ws", action="store_true", help="usar WebSocket en lugar de HTTP")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--json", default=None, help="guardar el resumen en este archivo")
+    args=ap.parse_args(argv)
+    out=asyncio.run(run(args.host, args.port, args.sessions, args.ws, args.seed))
+    text=json.dumps(out, ensure_ascii=False, indent=2)
+    print(text)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f: f.write(text)
+
+if __name__ == "__main__":
+    main()
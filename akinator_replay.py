@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+# Banco de repetición sobre el log de partidas (OUTCOME_LOG): cada partida con
+# jugador final conocido se vuelve a jugar contra ese jugador sin y con
+# priors, y se comparan acierto y preguntas por partida resuelta. Los priors
+# salen de la primera parte del log (--train) y se mide sobre el resto. El
+# "usuario" repite la respuesta registrada si se le hace la misma pregunta;
+# si no, responde con las tasas de "no sé" y error observadas en todo el log.
+#
+#   python akinator_replay.py [--log futbol_outcomes.jsonl] [--train 0.5] [--seeds 2]
+#                             [--mode classic|bayes] [--summary] [--json out.json]
+#
+# Sin partidas reales se puede generar un log con usuarios simulados (tasas
+# de "no sé" y error distintas por atributo) sobre un roster sintético:
+#   python akinator_replay.py --synthetic 2000 --synthesize 1500 --log /tmp/partidas.jsonl
+import argparse, json, os, random, time
+
+import akinator_futbol as af
+from akinator_bench import synthetic_columns, MAX_Q
+
+TRAIN = 0.5
+HARD_ATTRS = 0.25      # fracción de atributos que los usuarios simulados no suelen saber
+ERROR_ATTRS = 0.2      # fracción en la que se equivocan a menudo
+
+class SimulatedUsers:
+    # tasas (no sé, error) por atributo, con la interfaz rates(q) de QuestionPriors
+    def __init__(self, attrs, seed=0):
+        rng=random.Random(f"usuarios:{seed}"); self.table={}
+        for a in attrs:
+            unk=rng.uniform(0.3, 0.6) if rng.random()<HARD_ATTRS else rng.uniform(0.0, 0.05)
+            err=rng.uniform(0.1, 0.25) if rng.random()<ERROR_ATTRS else rng.uniform(0.0, 0.02)
+            self.table[a]=(unk, err)
+
+    def rates(self, q): return self.table.get(q[1], (0.0, 0.0))
+
+class LoggedUser:
+    def __init__(self, rec, attrs, rates, seed):
+        self.said={tuple(q):a for q,a in rec.get("path", ())}
+        self.attrs=attrs; self.rates=rates; self.rng=random.Random(f"usuario:{seed}")
+
+    def __call__(self, q):
+        if q in self.said: return self.said[q]
+        unk,err=self.rates.rates(q)
+        if self.rng.random()<unk: return None
+        exp=af.expected_answer(self.attrs, q)
+        if exp is None: return None
+        return (not exp) if self.rng.random()<err else exp
+
+def play(roster, answer, target, seed, mode=None, max_q=MAX_Q):
+    # -> (preguntas, acertó, sesión)
+    random.seed(seed); s=af.GameSession(roster, mode)
+    step=s.next_question(); n=0
+    while step["type"]=="question" and n<max_q:
+        step=s.answer(answer(step["q"])); n+=1
+    return n, step["type"]=="result" and step["nombre"]==target, s
+
+def _lookup(roster):
+    names=roster.names()
+    def attrs(name):
+        i=names.find(name) if name else None
+        return roster.personajes[i]["atributos"] if i is not None else None
+    return attrs
+
+def synthesize(roster, games, path, seed=0, mode=None, max_q=MAX_Q):
+    # juega contra objetivos al azar con usuarios simulados y lo anota como la app
+    users=SimulatedUsers(list(roster.index.stats.counts), seed)
+    rng=random.Random(f"objetivos:{seed}"); log=af.OutcomeLog(path)
+    af.QUESTION_PRIORS=None
+    for g in range(games):
+        target=roster.personajes[rng.randrange(len(roster.personajes))]
+        name=target["nombre"]
+        _, ok, s = play(roster, LoggedUser({}, target["atributos"], users, g), name, g, mode, max_q)
+        log.append(s.outcome_record("win" if ok else "added", name))
+    return users
+
+def _arm(roster, games, truth, lookup, seeds, mode, max_q):
+    played=solved=q_all=q_solved=0; t=time.perf_counter()
+    for gi,rec in enumerate(games):
+        attrs=lookup(rec["final"])
+        for s in range(seeds):
+            seed=s*1_000_003+gi
+            n, ok, _ = play(roster, LoggedUser(rec, attrs, truth, seed), rec["final"], seed, mode, max_q)
+            played+=1; solved+=ok; q_all+=n; q_solved+=n if ok else 0
+    return {"games":played, "accuracy":round(solved/played, 4) if played else 0.0,
+            "mean_questions":round(q_all/played, 3) if played else 0.0,
+            "questions_per_solved":round(q_solved/solved, 3) if solved else None,
+            "wall_s":round(time.perf_counter()-t, 3)}
+
+def replay(roster, path, train=TRAIN, seeds=2, mode=None, max_q=MAX_Q, strength=None):
+    lookup=_lookup(roster)
+    recs=[rec for rec,_ in af.iter_outcomes(path)]
+    cut=int(len(recs)*train)
+    truth=af.QuestionPriors(lookup, strength); prior=af.QuestionPriors(lookup, strength)
+    for i,rec in enumerate(recs):
+        attrs=lookup(rec.get("final"))
+        truth.add(rec, attrs)
+        if i<cut: prior.add(rec, attrs)
+    test=[rec for rec in recs[cut:] if lookup(rec.get("final")) is not None]
+    out={"log":path, "logged_games":len(recs), "train_games":cut, "test_games":len(test),
+         "seeds":seeds, "mode":mode or af.ENGINE_MODE, "learned":prior.summary()}
+    for label, pr in (("baseline", None), ("priors", prior)):
+        af.QUESTION_PRIORS=pr; af.SCORE_CACHE.clear()
+        out[label]=_arm(roster, test, truth, lookup, seeds, mode, max_q)
+    af.QUESTION_PRIORS=None
+    b,p=out["baseline"], out["priors"]
+    out["delta"]={"accuracy":round(p["accuracy"]-b["accuracy"], 4),
+                  "questions_per_solved":round(p["questions_per_solved"]-b["questions_per_solved"], 3)
+                  if b["questions_per_solved"] is not None and p["questions_per_solved"] is not None else None}
+    return out
+
+def main(argv=None):
+    ap=argparse.ArgumentParser(description="Repite las partidas registradas sin y con priors aprendidos")
+    ap.add_argument("--log", default=None, help="log de partidas (por defecto OUTCOME_LOG)")
+    ap.add_argument("--train", type=float, default=TRAIN, help="fracción inicial del log para aprender los priors")
+    ap.add_argument("--seeds", type=int, default=2)
+    ap.add_argument("--max-q", type=int, default=MAX_Q)
+    ap.add_argument("--mode", choices=("classic","bayes"), default=None)
+    ap.add_argument("--strength", type=float, default=None, help="PRIOR_STRENGTH")
+    ap.add_argument("--synthetic", type=int, default=0, help="usar un roster sintético de N futbolistas")
+    ap.add_argument("--seed", type=int, default=0, help="semilla del roster y de los usuarios sintéticos")
+    ap.add_argument("--synthesize", type=int, default=0, help="generar antes N partidas simuladas en --log")
+    ap.add_argument("--summary", action="store_true", help="mostrar las preguntas más penalizadas")
+    ap.add_argument("--data", default=None, help="ruta alternativa a futbol_dataset.json")
+    ap.add_argument("--json", default=None, help="guardar el informe en este archivo")
+    args=ap.parse_args(argv)
+    if args.data: af.DATAFILE=args.data
+    if not 0<args.train<1: ap.error("--train debe estar entre 0 y 1")
+    path=args.log or af.OUTCOME_LOG
+    if args.synthetic: roster=af.Roster(*synthetic_columns(args.synthetic, args.seed))
+    else: roster=af.Roster(*af.load_roster_columns())
+    if args.synthesize:
+        if os.path.exists(path): raise SystemExit(f"{path} ya existe: --synthesize escribe un log nuevo.")
+        t=time.perf_counter(); synthesize(roster, args.synthesize, path, args.seed, args.mode, args.max_q)
+        print(f"{args.synthesize} partidas simuladas en {time.perf_counter()-t:.1f}s -> {path}")
+    if not os.path.exists(path): raise SystemExit(f"No hay log de partidas en {path}.")
+    out=replay(roster, path, args.train, args.seeds, args.mode, args.max_q, args.strength)
+    if not out["test_games"]: raise SystemExit("Ninguna partida de prueba tiene un jugador final del roster.")
+    for label in ("baseline", "priors"):
+        r=out[label]
+        print(f"{label:9s} acierto={r['accuracy']:.3f}  preguntas={r['mean_questions']:.2f}  "
+              f"por resuelta={r['questions_per_solved']}  ({r['games']} partidas, {r['wall_s']:.1f}s)")
+    d=out["delta"]; dq=d["questions_per_solved"]
+    print(f"priors de {out['train_games']} partidas, prueba en {out['test_games']}: "
+          f"acierto {d['accuracy']:+.3f}, preguntas por resuelta {'—' if dq is None else f'{dq:+.2f}'}")
+    if args.summary:
+        for r in out["learned"]["most_penalized"]:
+            print(f"  peso={r['weight']:.3f} no sé={r['unknown']:.2f} error={r['error']:.2f} ({r['asked']}x) {r['q']}")
+    if args.json: af._atomic_write_text(args.json, json.dumps(out, ensure_ascii=False, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,230 @@
+# -*- coding: utf-8 -*-
+# Servidor asyncio (HTTP + WebSocket) con muchas partidas sobre un roster compartido.
+#
+#   python akinator_server.py --port 8765 --ttl 600
+#
+# HTTP (JSON):
+#   POST   /sessions              -> {"id", "step"}
+#   GET    /sessions/<id>         -> {"id", "step"}
+#   POST   /sessions/<id>/answer  body {"answer": true|false|null}
+#   POST   /sessions/<id>/undo    (y /redo)
+#   DELETE /sessions/<id>
+#   GET    /stats                 -> sesiones vivas y memoria por sesión
+# WebSocket en /ws: mensajes {"op":"new"|"answer"|"undo"|"redo", "answer":...};
+# cada conexión juega una sesión y recibe {"id", "step"} tras cada mensaje.
+import asyncio, argparse, base64, hashlib, json, struct, sys, time, uuid
+
+import akinator_futbol as af
+
+SESSION_TTL = 600.0
+EVICT_EVERY = 5.0
+WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC11B85"
+
+def deep_sizeof(obj, seen=None):
+    # bytes propios de la sesión; el roster compartido no cuenta
+    if seen is None: seen=set()
+    if id(obj) in seen: return 0
+    seen.add(id(obj))
+    n=sys.getsizeof(obj)
+    if isinstance(obj, af.PlayerView): return n  # las columnas son del roster
+    if isinstance(obj, af.PlayerRows): return n+deep_sizeof(obj.rows, seen)
+    if isinstance(obj, dict):
+        n+=sum(deep_sizeof(k,seen)+deep_sizeof(v,seen) for k,v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        n+=sum(deep_sizeof(x,seen) for x in obj)
+    return n
+
+def session_nbytes(session):
+    seen={id(session.roster), id(session.catalog)}  # referencias compartidas
+    n=sys.getsizeof(session)
+    for k,v in vars(session).items():
+        if k in ("roster","index","catalog"): continue
+        n+=deep_sizeof(v, seen)
+    return n
+
+def _json_step(step):
+    if step is None: return None
+    out=dict(step)
+    if "q" in out: out["q"]=list(out["q"])
+    return out
+
+class SessionHub:
+    def __init__(self, roster, ttl=SESSION_TTL, mode=None):
+        self.roster=roster; self.ttl=ttl; self.mode=mode
+        self.sessions={}; self.last_seen={}
+        self.created=0; self.evicted=0
+
+    def new(self):
+        sid=uuid.uuid4().hex; s=af.GameSession(self.roster, self.mode)
+        self.sessions[sid]=s; self.last_seen[sid]=time.monotonic(); self.created+=1
+        return sid, s.next_question()
+
+    def get(self, sid):
+        s=self.sessions.get(sid)
+        if s is not None: self.last_seen[sid]=time.monotonic()
+        return s
+
+    def drop(self, sid):
+        self.last_seen.pop(sid, None)
+        return self.sessions.pop(sid, None) is not None
+
+    def evict_idle(self):
+        limit=time.monotonic()-self.ttl
+        old=[sid for sid,t in self.last_seen.items() if t<limit]
+        for sid in old: self.drop(sid)
+        self.evicted+=len(old)
+        return len(old)
+
+    def stats(self):
+        sizes=[session_nbytes(s) for s in self.sessions.values()]
+        return {"sessions":len(sizes), "created":self.created, "evicted":self.evicted,
+                "session_bytes_total":sum(sizes),
+                "session_bytes_mean":(sum(sizes)/len(sizes)) if sizes else 0,
+                "session_bytes_max":max(sizes) if sizes else 0,
+                "roster_size":len(self.roster.personajes),
+                "score_cache":af.SCORE_CACHE.stats()}
+
+    def handle(self, method, path, body):
+        # -> (status, payload)
+        parts=[p for p in path.split("?")[0].split("/") if p]
+        if parts==["stats"] and method=="GET": return 200, self.stats()
+        if parts==["sessions"] and method=="POST":
+            sid, step=self.new(); return 201, {"id":sid, "step":_json_step(step)}
+        if len(parts)<2 or parts[0]!="sessions": return 404, {"error":"not found"}
+        sid=parts[1]
+        if method=="DELETE" and len(parts)==2:
+            return (200, {"id":sid}) if self.drop(sid) else (404, {"error":"unknown session"})
+        s=self.get(sid)
+        if s is None: return 404, {"error":"unknown session"}
+        if method=="GET" and len(parts)==2: step=s.step
+        elif method=="POST" and parts[2:]==["answer"]:
+            ans=(body or {}).get("answer")
+            if ans not in (True, False, None): return 400, {"error":"answer must be true, false or null"}
+            step=s.answer(ans)
+        elif method=="POST" and parts[2:] in (["undo"], ["redo"]):
+            step=s.undo() if parts[2]=="undo" else s.redo()
+            if step is None: step=s.step
+        else: return 404, {"error":"not found"}
+        return 200, {"id":sid, "step":_json_step(step)}
+
+# ---------------- HTTP ----------------
+REASONS={200:"OK", 201:"Created", 400:"Bad Request", 404:"Not Found", 101:"Switching Protocols"}
+
+async def _read_request(reader):
+    line=await reader.readline()
+    if not line: return None
+    method, path, _ = line.decode("latin-1").split(" ", 2)
+    headers={}
+    while True:
+        h=await reader.readline()
+        if h in (b"\r\n", b"\n", b""): break
+        k,_,v=h.decode("latin-1").partition(":"); headers[k.strip().lower()]=v.strip()
+    n=int(headers.get("content-length","0") or 0)
+    body=await reader.readexactly(n) if n else b""
+    return method, path, headers, body
+
+def _response(status, payload, keep_alive=True):
+    data=json.dumps(payload, ensure_ascii=False).encode("utf-8")
+    head=(f"HTTP/1.1 {status} {REASONS.get(status,'')}\r\n"
+          f"Content-Type: application/json; charset=utf-8\r\nContent-Length: {len(data)}\r\n"
+          f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+    return head.encode("latin-1")+data
+
+# ---------------- WebSocket ----------------
+def ws_frame(payload, opcode=1):
+    n=len(payload)
+    if n<126: head=struct.pack("!BB", 0x80|opcode, n)
+    elif n<65536: head=struct.pack("!BBH", 0x80|opcode, 126, n)
+    else: head=struct.pack("!BBQ", 0x80|opcode, 127, n)
+    return head+payload
+
+async def ws_read(reader):
+    # -> (opcode, payload); solo mensajes de un frame (lo que envían los clientes de juego)
+    b1,b2=await reader.readexactly(2)
+    op=b1&0x0F; n=b2&0x7F
+    if n==126: n=struct.unpack("!H", await reader.readexactly(2))[0]
+    elif n==127: n=struct.unpack("!Q", await reader.readexactly(8))[0]
+    mask=await reader.readexactly(4) if b2&0x80 else None
+    data=await reader.readexactly(n)
+    if mask: data=bytes(c^mask[i&3] for i,c in enumerate(data))
+    return op, data
+
+async def _serve_ws(hub, headers, reader, writer):
+    key=headers.get("sec-websocket-key","")
+    accept=base64.b64encode(hashlib.sha1((key+WS_GUID).encode()).digest()).decode()
+    writer.write(("HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                  f"Sec-WebSocket-Accept: {accept}\r\n\r\n").encode("latin-1"))
+    await writer.drain()
+    sid=None
+    try:
+        while True:
+            op, data = await ws_read(reader)
+            if op==8: writer.write(ws_frame(b"", 8)); break
+            if op==9: writer.write(ws_frame(data, 10)); continue
+            if op!=1: continue
+            try: msg=json.loads(data)
+            except ValueError: msg={}
+            kind=msg.get("op")
+            if kind=="new":
+                if sid is not None: hub.drop(sid)
+                _, payload = hub.handle("POST", "/sessions", None); sid=payload["id"]
+            elif sid is None: payload={"error":"send op=new first"}
+            elif kind=="answer": _, payload = hub.handle("POST", f"/sessions/{sid}/answer", msg)
+            elif kind in ("undo","redo"): _, payload = hub.handle("POST", f"/sessions/{sid}/{kind}", None)
+            else: payload={"error":"unknown op"}
+            writer.write(ws_frame(json.dumps(payload, ensure_ascii=False).encode("utf-8")))
+            await writer.drain()
+    except (asyncio.IncompleteReadError, ConnectionError):
+        pass
+    finally:
+        if sid is not None: hub.drop(sid)
+
+async def _serve_conn(hub, reader, writer):
+    try:
+        while True:
+            req=await _read_request(reader)
+            if req is None: break
+            method, path, headers, raw = req
+            if headers.get("upgrade","").lower()=="websocket" and path.split("?")[0]=="/ws":
+                await _serve_ws(hub, headers, reader, writer); break
+            try: body=json.loads(raw) if raw else None
+            except ValueError: body=None
+            status, payload = hub.handle(method, path, body)
+            keep=headers.get("connection","").lower()!="close"
+            writer.write(_response(status, payload, keep)); await writer.drain()
+            if not keep: break
+    except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+        pass
+    finally:
+        try: writer.close(); await writer.wait_closed()
+        except Exception: pass
+
+async def _evict_loop(hub):
+    while True:
+        await asyncio.sleep(EVICT_EVERY)
+        hub.evict_idle()
+
+async def serve(host, port, ttl, mode=None):
+    hub=SessionHub(af.Roster.load(), ttl, mode)
+    server=await asyncio.start_server(lambda r,w: _serve_conn(hub, r, w), host, port, backlog=4096)
+    ev=asyncio.ensure_future(_evict_loop(hub))
+    print(f"Sirviendo {len(hub.roster.personajes)} futbolistas en http://{host}:{port} (ttl={ttl}s)", flush=True)
+    try:
+        async with server: await server.serve_forever()
+    finally:
+        ev.cancel()
+
+def main(argv=None):
+    ap=argparse.ArgumentParser(description="Servidor multi-sesión del Akinator de futbolistas")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--ttl", type=float, default=SESSION_TTL, help="segundos de inactividad antes de expulsar una sesión")
+    ap.add_argument("--data", default=None, help="ruta alternativa a futbol_dataset.json")
+    ap.add_argument("--mode", choices=("classic","bayes"), default=None, help="motor de inferencia (por defecto ENGINE_MODE)")
+    args=ap.parse_args(argv)
+    if args.data: af.DATAFILE=args.data
+    try: asyncio.run(serve(args.host, args.port, args.ttl, args.mode))
+    except KeyboardInterrupt: pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+# Prueba de estrés de escritores concurrentes: N procesos dan de alta
+# jugadores y rasgos del catálogo a la vez sobre un dataset temporal (con
+# compactaciones frecuentes de por medio) y al final se comprueba, con un
+# store recién abierto, que no falta ni sobra ninguna alta. Todos compiten
+# además por unos nombres compartidos con add_player(unique=True): cada uno
+# debe quedar exactamente una vez.
+#
+#   python akinator_stress.py [--writers 8] [--players 200] [--catalog-every 10]
+#                             [--batch 0] [--shared 20] [--backend json|sqlite] [--keep]
+import argparse, json, os, shutil, sys, tempfile, time
+from collections import Counter
+from multiprocessing import Pool
+
+import akinator_futbol as af
+
+POSITIONS = ("Portero","Defensa","Medio","Delantero")
+
+def _name(w, i): return f"Estrés {w} {i}"
+def _key(w, i): return f"estres_{w}_{i}"
+def _shared(j): return f"Compartido {j}"
+
+def _writer(task):
+    # -> (escritor, nombres compartidos ganados, segundos, espera en el cerrojo, fusiones)
+    w, path, players, catalog_every, batch, shared, compact_every, start = task
+    af.DATAFILE=path; af.JOURNAL_COMPACT_EVERY=compact_every
+    st=af._store()
+    time.sleep(max(0.0, start-time.time()))  # todos arrancan a la vez
+    t=time.perf_counter(); won=0; pending=[]; every=max(1, players//shared) if shared else 0
+    for i in range(players):
+        p={"nombre":_name(w, i), "atributos":{"posicion":POSITIONS[i%4], "es_estres":True}}
+        if batch:
+            pending.append({"op":"player", "data":p})
+            if catalog_every and i%catalog_every==0: pending.append({"op":"catalog", "key":_key(w, i), "question":f"¿Rasgo {w}/{i}?"})
+            if len(pending)>=batch: st.append_batch(pending); pending=[]
+        else:
+            st.add_player(p)
+            if catalog_every and i%catalog_every==0: st.add_catalog_entry(_key(w, i), f"¿Rasgo {w}/{i}?")
+        if every and i%every==0 and i//every<shared:
+            won+=bool(st.add_player({"nombre":_shared(i//every), "atributos":{}}, unique=True))
+    if pending: st.append_batch(pending)
+    for j in range(shared): won+=bool(st.add_player({"nombre":_shared(j), "atributos":{}}, unique=True))
+    return w, won, time.perf_counter()-t, st.lock.wait_s, st.merges
+
+def check(path, writers, players, catalog_every, shared, base):
+    # -> lista de problemas leyendo con un store nuevo (sin caché del proceso)
+    st=(af.SqliteStore if path.lower().endswith(af.SQLITE_SUFFIXES) else af.DatasetStore)(path)
+    data=st.read(); names=Counter(p["nombre"] for p in data["personajes"])
+    errors=[]
+    missing=[_name(w, i) for w in range(writers) for i in range(players) if names[_name(w, i)]!=1]
+    if missing: errors.append(f"{len(missing)} jugadores perdidos o repetidos (p. ej. {missing[0]!r})")
+    wrong=[_shared(j) for j in range(shared) if names[_shared(j)]!=1]
+    if wrong: errors.append(f"{len(wrong)} nombres compartidos ausentes o repetidos (p. ej. {wrong[0]!r})")
+    keys=[_key(w, i) for w in range(writers) for i in range(0, players, catalog_every or players+1)]
+    lost=[k for k in keys if k not in data["catalog"]]
+    if lost: errors.append(f"{len(lost)} rasgos del catálogo perdidos (p. ej. {lost[0]!r})")
+    extra=len(data["personajes"])-base-writers*players-shared
+    if extra: errors.append(f"{extra:+d} jugadores respecto a lo esperado")
+    return errors
+
+def run(workdir, backend="json", writers=8, players=200, catalog_every=10, batch=0, shared=20,
+        compact_every=25, processes=None):
+    path=os.path.join(workdir, "stress_dataset."+("sqlite" if backend=="sqlite" else "json"))
+    af.DATAFILE=path; af._STORE=None
+    base=len(af._store().read()["personajes"])
+    start=time.time()+0.5
+    tasks=[(w, path, players, catalog_every, batch, shared, compact_every, start) for w in range(writers)]
+    with Pool(processes or writers) as pool: res=pool.map(_writer, tasks, chunksize=1)
+    wall=max(r[2] for r in res)  # desde la salida común hasta el último escritor
+    errors=check(path, writers, players, catalog_every, shared, base)
+    af.compact_dataset()
+    errors+=[f"tras compactar: {e}" for e in check(path, writers, players, catalog_every, shared, base)]
+    writes=writers*(players+shared+(len(range(0, players, catalog_every)) if catalog_every else 0))
+    return {"backend":backend, "writers":writers, "players_per_writer":players, "batch":batch,
+            "shared_names":shared, "shared_won":sum(r[1] for r in res),
+            "wall_s":round(wall, 3), "writes_per_s":round(writes/wall, 1) if wall>0 else 0.0,
+            "lock_wait_s":round(sum(r[3] for r in res), 3), "merges":sum(r[4] for r in res),
+            "errors":errors}
+
+def main(argv=None):
+    ap=argparse.ArgumentParser(description="Escritores concurrentes sobre el dataset del Akinator")
+    ap.add_argument("--writers", type=int, default=8, help="procesos escritores")
+    ap.add_argument("--players", type=int, default=200, help="altas por escritor")
+    ap.add_argument("--catalog-every", type=int, default=10, help="un rasgo nuevo cada N altas (0 = ninguno)")
+    ap.add_argument("--batch", type=int, default=0, help="usar append_batch con lotes de este tamaño")
+    ap.add_argument("--shared", type=int, default=20, help="nombres por los que compiten todos los escritores")
+    ap.add_argument("--compact-every", type=int, default=25, help="JOURNAL_COMPACT_EVERY en los escritores")
+    ap.add_argument("--backend", choices=("json","sqlite"), default="json")
+    ap.add_argument("--dir", default=None, help="directorio de trabajo (por defecto uno temporal)")
+    ap.add_argument("--keep", action="store_true", help="no borrar el directorio temporal")
+    ap.add_argument("--json", default=None, help="guardar el resumen en este archivo")
+    args=ap.parse_args(argv)
+    workdir=args.dir or tempfile.mkdtemp(prefix="akinator_stress_")
+    try:
+        out=run(workdir, args.backend, args.writers, args.players, args.catalog_every, args.batch,
+                args.shared, args.compact_every)
+    finally:
+        if not args.dir and not args.keep: shutil.rmtree(workdir, ignore_errors=True)
+    text=json.dumps(out, ensure_ascii=False, indent=2)
+    print(text)
+    if args.json: af._atomic_write_text(args.json, text)
+    if out["errors"]: sys.exit(1)
+
+if __name__ == "__main__":
+    main()